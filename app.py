@@ -1,29 +1,33 @@
+import time
+_script_started = time.perf_counter()
 import streamlit as st
-import whisper
-import tempfile
 import os
-import time
-import re
-import requests
+import queue
 from datetime import timedelta
-import imageio_ffmpeg
 import shutil
 import stat
-import base64
-import json
+import re
+import secrets
 import streamlit.components.v1 as components
-
-# --- Patch: Set ffmpeg path manually ---
-ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-bin_dir = os.path.join(os.getcwd(), "bin")
-if not os.path.exists(bin_dir):
-    os.makedirs(bin_dir)
-target_ffmpeg = os.path.join(bin_dir, "ffmpeg")
-if not os.path.exists(target_ffmpeg):
-    shutil.copy(ffmpeg_exe, target_ffmpeg)
-    st_mode = os.stat(target_ffmpeg).st_mode
-    os.chmod(target_ffmpeg, st_mode | stat.S_IEXEC)
-os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+from streamlit.logger import get_logger
+from podsnap import config, metrics
+from podsnap.audio import PcmStore
+from podsnap.cache import TranscriptCache, file_digest
+from podsnap.download import AudioStore, resolve_audio_url
+from podsnap.inference import InferenceService
+from podsnap.models import ModelRegistry
+from podsnap.audio_server import AudioServer
+from podsnap.parallel import TranscriptionPool
+from podsnap.player import OWNER_COOKIE, TranscriptPayloads, render_player, transcript_payload
+from podsnap.recommend import Recommender
+from podsnap.search import SearchIndex
+from podsnap.static_mirror import StaticMirror
+# whisper/torch and imageio_ffmpeg are imported lazily, only once a transcription actually needs them
+_imports_done = time.perf_counter()
+logger = get_logger(__name__)
+# Per-stage timings go out as JSON log lines through Streamlit's log handler, and optionally to a Prometheus textfile
+get_logger(metrics.logger.name)
+metrics.METRICS.path = config.METRICS_FILE or None
 
 # --- Page Config ---
 st.set_page_config(page_title="PodSnap", page_icon="⚡️", layout="wide", initial_sidebar_state="expanded")
@@ -93,24 +97,129 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Helper Functions ---
+MODEL_LABELS = {"tiny": "极速 (tiny)", "base": "标准 (base)", "small": "精准 (small)"}
+
+@st.cache_resource(show_spinner=False)
+def ensure_ffmpeg():
+    # --- Patch: Set ffmpeg path manually --- (once per process, before anything decodes audio)
+    bin_dir = os.path.join(os.getcwd(), "bin")
+    if not os.path.exists(bin_dir):
+        os.makedirs(bin_dir)
+    target_ffmpeg = os.path.join(bin_dir, "ffmpeg")
+    if not os.path.exists(target_ffmpeg):
+        import imageio_ffmpeg
+        shutil.copy(imageio_ffmpeg.get_ffmpeg_exe(), target_ffmpeg)
+        st_mode = os.stat(target_ffmpeg).st_mode
+        os.chmod(target_ffmpeg, st_mode | stat.S_IEXEC)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+    return target_ffmpeg
+
 @st.cache_resource
-def load_model():
-    return whisper.load_model("base")
+def get_transcription_pool():
+    if config.WORKERS <= 1: return None
+    return TranscriptionPool(config.WHISPER_MODEL, config.WORKERS, config.TORCH_THREADS, quantize=config.QUANTIZE)
 
-def get_audio_base64(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+@st.cache_resource
+def get_transcript_cache():
+    return TranscriptCache(os.path.join(config.CACHE_DIR, "transcripts"), config.TRANSCRIPT_CACHE_MB << 20)
 
-def resolve_podcast_url(url):
-    headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'}
+@st.cache_resource(show_spinner=False)
+def get_model_registry():
+    registry = ModelRegistry(config.MODEL_TIERS, quantize=config.QUANTIZE, fallback_depth=config.FALLBACK_QUEUE_DEPTH)
+    registry.preload(config.PRELOAD_MODELS)
+    return registry
+
+@st.cache_resource
+def get_pcm_store():
+    return PcmStore(os.path.join(config.CACHE_DIR, "pcm"), config.PCM_CACHE_MB << 20)
+
+@st.cache_resource
+def get_search_index():
+    return SearchIndex(os.path.join(config.CACHE_DIR, "search.db"))
+
+def index_episode(index, audio_path, title, segments):
+    index.add_episode(file_digest(audio_path), title or os.path.basename(audio_path), audio_path, segments)
+
+def claim_episode(audio_path, title):
+    # Transcripts are shared by everyone who imports the same audio; search only shows a session the ones it imported
+    get_search_index().add_owner(st.session_state.owner, file_digest(audio_path), title or os.path.basename(audio_path))
+
+@st.cache_resource
+def get_inference_service():
+    # One service per process owns the model; sessions only hold job handles
+    ensure_ffmpeg()
+    index = get_search_index()
+    service = InferenceService(get_model_registry(), cache=get_transcript_cache(), max_queue=config.QUEUE_SIZE, max_active=config.MAX_ACTIVE_JOBS, batch_size=config.BATCH_SIZE, pool=get_transcription_pool(), pool_min_seconds=config.PARALLEL_MIN_SECONDS, pcm_store=get_pcm_store(), vad=config.VAD, on_done=lambda job: index_episode(index, job.audio_path, job.title, job.segments), profile_slow=config.PROFILE_SLOW_SECONDS, profile_dir=config.PROFILE_DIR)
+    metrics.gauge("podsnap_jobs_queued", lambda: service.stats()["queued"], "Transcription jobs waiting for a slot.")
+    metrics.gauge("podsnap_jobs_active", lambda: service.stats()["active"], "Transcription jobs currently running.")
+    return service
+
+@st.cache_resource
+def get_audio_server():
+    server = AudioServer(config.AUDIO_HOST, config.AUDIO_PORT)
+    # Quotes captured in the player are saved through the same server, per episode and per owner id
+    index = get_search_index()
+    server.route("quotes", get=lambda path, query: index.quotes(quote_owner(query), file_digest(path)), post=lambda path, query, q: index.add_quote(quote_owner(query), file_digest(path), float(q["start"]), float(q["end"]), str(q["text"])[:2000]))
+    transcripts = get_player_transcripts()
+    server.route("transcript", get=lambda path, query: transcripts.get(path, query.get("v")))
+    if config.METRICS_ENDPOINT: server.page("metrics", metrics.render)
+    return server
+
+_OWNER = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+def quote_owner(query):
+    # Audio tokens are shared by everyone who imported the same file, so quotes also need the owner's secret id
+    owner = query.get("owner", "")
+    if not _OWNER.fullmatch(owner): raise ValueError("missing or malformed owner")
+    return owner
+
+@st.cache_resource
+def get_player_transcripts():
+    # Transcript JSON per audio file and content version, fetched by the player instead of being inlined in the page
+    return TranscriptPayloads()
+
+@st.cache_resource
+def get_static_mirror():
+    # Streamlit serves ./static next to app.py at <baseUrlPath>/app/static/ when server.enableStaticServing is on
+    if not config.STATIC_MIRROR_MB or not st.get_option("server.enableStaticServing"): return None
+    base = st.get_option("server.baseUrlPath").strip("/")
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "podsnap")
+    return StaticMirror(root, config.STATIC_MIRROR_MB << 20, f"/{base}/app/static/podsnap" if base else "/app/static/podsnap")
+
+def publish_player(payload):
+    # Makes a built page's transcript (and its same-origin fallback copies) available again; cheap enough for every rerun
+    audio_file_path, token, version, data = payload
+    get_player_transcripts().put(audio_file_path, version, data)
+    mirror = get_static_mirror()
+    if mirror is None: return None
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        html = response.text
-        audio_match = re.search(r'https?://[^\s"\'\\]+\.(?:mp3|m4a|wav)[^\s"\'\\]*', html)
-        if audio_match: return audio_match.group(0).replace('\\u002F', '/')
+        audio = mirror.add_file(token, audio_file_path)
+        return audio and {"audio": audio, "transcript": mirror.add_bytes(f"{token}.{version}", ".json", data)}
+    except OSError:
+        logger.warning("could not mirror %s for the static fallback", audio_file_path, exc_info=True)
         return None
+
+def build_player(segments, audio_file_path, seek_to, owner):
+    server = get_audio_server()
+    audio_path = server.register(audio_file_path)
+    token = os.path.splitext(os.path.basename(audio_path))[0]
+    with metrics.stage("render", segments=len(segments)) as info:
+        # The version only changes the page (and reloads the iframe) when the transcript itself changed
+        version, payload = transcript_payload(segments)
+        published = (os.path.abspath(audio_file_path), token, version, payload)
+        fallback = publish_player(published)
+        recommendations = get_recommendations(" ".join(s['text'] for s in segments))
+        html = render_player(f"/transcript/{token}?v={version}", recommendations, audio_path, f"/quotes/{token}?owner={owner}", seek_to, server.port, config.AUDIO_BASE_URL, owner, fallback, file_digest(audio_file_path))
+        info["bytes"], info["transcript_bytes"] = len(html.encode("utf-8")), len(payload)
+    return {"html": html, "payload": published}
+
+@st.cache_resource
+def get_audio_store():
+    return AudioStore(os.path.join(config.CACHE_DIR, "audio"), config.AUDIO_STORE_MB << 20)
+
+def resolve_podcast_url(url):
+    try:
+        with metrics.stage("resolve"): return resolve_audio_url(url)
     except Exception as e:
         st.error(f"解析链接失败: {e}")
         return None
@@ -118,39 +227,49 @@ def resolve_podcast_url(url):
 def download_audio(url):
     try:
         with st.spinner("正在从链接下载音频..."):
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            suffix = ".mp3"
-            if ".m4a" in url.lower(): suffix = ".m4a"
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            for chunk in response.iter_content(chunk_size=8192): tmp.write(chunk)
-            tmp.close()
-            return tmp.name
+            bar = st.progress(0.0)
+            with metrics.stage("download") as info:
+                path = get_audio_store().fetch(url, parts=config.DOWNLOAD_PARTS, progress=lambda done, total: bar.progress(min(1.0, done / total) if total else 0.0), info=info)
+                info["bytes"] = os.path.getsize(path)
+            bar.empty()
+            return path
     except Exception as e:
         st.error(f"下载音频失败: {e}")
         return None
 
+def open_search_hit(hit):
+    index = get_search_index()
+    episode = index.episode(hit['episode'], st.session_state.owner)
+    if not episode or not os.path.exists(episode['audio_path']):
+        st.warning("该节目的音频已被清理，请重新导入。")
+        return
+    st.session_state.audio_file_path, st.session_state.audio_title = episode['audio_path'], episode['title']
+    st.session_state.transcript, st.session_state.transcript_complete = index.segments(hit['episode']), True
+    st.session_state.seek_to = hit['start']
+    st.rerun()
+
+@st.cache_resource
+def get_recommender():
+    return Recommender.from_file(config.CATALOG_PATH)
+
+@st.cache_data(max_entries=64, show_spinner=False)
 def get_recommendations(text):
-    catalog = [
-        {"keywords": ["书", "阅读", "作者", "文学"], "name": "《反脆弱》精装版", "price": "45.00", "tag": "book", "color": "#4A90E2"},
-        {"keywords": ["咖啡", "提神", "拿铁", "美式"], "name": "精品挂耳咖啡", "price": "89.00", "tag": "coffee", "color": "#6F4E37"},
-        {"keywords": ["抹茶", "茶", "绿茶"], "name": "宇治抹茶粉", "price": "58.00", "tag": "matcha", "color": "#77DD77"},
-        {"keywords": ["科技", "手机", "电脑", "AI", "智能"], "name": "氮化镓快充头", "price": "129.00", "tag": "tech", "color": "#FFD700"},
-        {"keywords": ["心理", "情绪", "压力", "健康"], "name": "冥想香薰蜡烛", "price": "168.00", "tag": "candle", "color": "#A2ADD0"}
-    ]
-    results = []
-    for item in catalog:
-        if any(kw in text for kw in item['keywords']): results.append(item)
-    if len(results) < 2: results.append({"name": "PodSnap Pro 会员", "price": "19.9/月", "tag": "premium", "color": "#8B5E3C"})
-    if len(results) < 3: results.append({"name": "车载手机支架", "price": "35.00", "tag": "car", "color": "#555555"})
-    for item in results:
-        item['img'] = f"https://images.weserv.nl/?url=loremflickr.com/200/200/{item['tag']},product/all"
-    return results[:3]
+    return get_recommender().recommend(text)
 
 # --- State Management ---
 if 'transcript' not in st.session_state: st.session_state.transcript = []
 if 'audio_file_path' not in st.session_state: st.session_state.audio_file_path = None
-if 'model' not in st.session_state: st.session_state.model = None
+if 'job' not in st.session_state: st.session_state.job = None
+if 'transcript_complete' not in st.session_state: st.session_state.transcript_complete = False
+if 'audio_title' not in st.session_state: st.session_state.audio_title = None
+if 'seek_to' not in st.session_state: st.session_state.seek_to = None
+if 'owner' not in st.session_state:
+    # Random per-browser id that scopes saved quotes; the player page keeps it in a cookie across visits
+    owner_cookie = st.context.cookies.get(OWNER_COOKIE)
+    st.session_state.owner = owner_cookie if isinstance(owner_cookie, str) and _OWNER.fullmatch(owner_cookie) else secrets.token_urlsafe(16)
+
+# Filled with segments while a streaming transcription is running
+live_view = st.empty()
 
 # --- Sidebar: Input ---
 with st.sidebar:
@@ -164,6 +283,7 @@ with st.sidebar:
                 downloaded_path = download_audio(real_audio_url)
                 if downloaded_path:
                     st.session_state.audio_file_path = downloaded_path
+                    st.session_state.audio_title, st.session_state.seek_to = podcast_url, None
                     st.success("✅ 下载成功！")
                     st.rerun()
             else: st.error("未能嗅探到音频，请检查链接。")
@@ -171,18 +291,69 @@ with st.sidebar:
         uploaded_file = st.file_uploader("上传音频", type=["mp3", "wav", "m4a"], label_visibility="collapsed", key="file_uploader_field")
         st.markdown("<p style='font-size: 11px; color: #666; margin-top: 5px; margin-left: 5px;'>支持 MP3, WAV, M4A 格式，建议文件大小不超过 100MB</p>", unsafe_allow_html=True)
         if uploaded_file and st.session_state.audio_file_path is None:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp:
-                tmp.write(uploaded_file.getvalue())
-                st.session_state.audio_file_path = tmp.name
+            data = uploaded_file.getvalue()
+            with metrics.stage("upload", bytes=len(data)): st.session_state.audio_file_path = get_audio_store().put_bytes(data, os.path.splitext(uploaded_file.name)[1])
+            st.session_state.audio_title, st.session_state.seek_to = uploaded_file.name, None
             st.success("✅ 已加载本地文件")
-    if st.session_state.audio_file_path and not st.session_state.transcript:
+    with st.expander("🔎 搜索转写与金句"):
+        search_query = st.text_input("搜索", placeholder="关键词...", label_visibility="collapsed", key="search_field")
+        if search_query:
+            hits = get_search_index().search(search_query, owner=st.session_state.owner)
+            if not hits: st.caption("没有找到相关内容")
+            for i, hit in enumerate(hits):
+                label = f"{'💡' if hit['kind'] == 'quote' else '🎙️'} {timedelta(seconds=int(hit['start']))} · {hit['text'][:40]}"
+                if st.button(label, key=f"search_hit_{i}", help=hit['title'], use_container_width=True): open_search_hit(hit)
+    if st.session_state.audio_file_path and not st.session_state.transcript_complete:
         st.markdown("---")
-        if st.button("🚀 开始 AI 转写", type="primary", use_container_width=True):
-            with st.spinner("正在转写..."):
-                if st.session_state.model is None: st.session_state.model = load_model()
-                result = st.session_state.model.transcribe(st.session_state.audio_file_path, language="zh", initial_prompt="请使用简体中文进行转写。")
-                st.session_state.transcript = result['segments']
+        job = st.session_state.job
+        if job is None:
+            tier = st.selectbox("转写模型", config.MODEL_TIERS, index=config.MODEL_TIERS.index(config.WHISPER_MODEL) if config.WHISPER_MODEL in config.MODEL_TIERS else 0, format_func=lambda t: MODEL_LABELS.get(t, t), key="model_tier_field")
+        if job is None and st.button("🚀 开始 AI 转写", type="primary", use_container_width=True):
+            cache, service = get_transcript_cache(), get_inference_service()
+            digest = file_digest(st.session_state.audio_file_path)
+            settings = dict(language=config.LANGUAGE, initial_prompt=config.INITIAL_PROMPT, vad=config.VAD, int8=config.QUANTIZE)
+            # Under load the service may hand out a smaller tier; a cached result from the requested tier still wins
+            model = service.effective_model(tier)
+            for candidate in dict.fromkeys((tier, model)):
+                segments = cache.get(cache.make_key(digest, model=candidate, **settings))
+                if segments is not None:
+                    index = get_search_index()
+                    if not index.has_episode(digest): index_episode(index, st.session_state.audio_file_path, st.session_state.audio_title, segments)
+                    claim_episode(st.session_state.audio_file_path, st.session_state.audio_title)
+                    st.session_state.transcript = segments
+                    st.session_state.transcript_complete = True
+                    st.rerun()
+            try:
+                st.session_state.job = service.submit(st.session_state.audio_file_path, model, cache_key=cache.make_key(digest, model=model, **settings), language=config.LANGUAGE, initial_prompt=config.INITIAL_PROMPT, title=st.session_state.audio_title)
+                if model != tier: st.toast(f"当前排队较多，已切换为 {MODEL_LABELS.get(model, model)} 模型")
+                st.rerun()
+            except queue.Full:
+                st.warning("当前转写任务较多，请稍后再试。")
+        elif job is not None:
+            if st.button("⏹ 取消转写", use_container_width=True):
+                job.cancel()
+                st.session_state.job = None
+                st.session_state.transcript = []
                 st.rerun()
+            # The job runs in the shared service, so a rerun only interrupts this polling loop, not inference
+            status = st.empty()
+            progress = st.progress(job.progress, text="正在转写...")
+            while not job.done:
+                position = job.position()
+                status.caption(f"排队中，前面还有 {position - 1} 个任务" if position else "正在转写...")
+                progress.progress(job.progress, text=f"正在转写... {job.progress:.0%}")
+                st.session_state.transcript = list(job.segments)
+                live_view.markdown("\n\n".join(f"`{timedelta(seconds=int(s['start']))}` {s['text']}" for s in st.session_state.transcript[-30:]))
+                job.wait(0.5)
+            st.session_state.job = None
+            if job.status == "done":
+                st.session_state.transcript = job.segments
+                st.session_state.transcript_complete = True
+                claim_episode(st.session_state.audio_file_path, st.session_state.audio_title)
+            elif job.status == "failed":
+                st.session_state.transcript = []
+                st.error(f"转写失败: {job.error}")
+            if job.status != "failed": st.rerun()
 
 # --- Main Interface ---
 if not st.session_state.audio_file_path:
@@ -202,177 +373,21 @@ if not st.session_state.audio_file_path:
     """, unsafe_allow_html=True)
 
 elif st.session_state.audio_file_path and st.session_state.transcript:
-    transcript_json = json.dumps(st.session_state.transcript)
-    audio_b64 = get_audio_base64(st.session_state.audio_file_path)
-    full_text = " ".join([s['text'] for s in st.session_state.transcript])
-    recommendations = get_recommendations(full_text)
-    recs_json = json.dumps(recommendations)
-    
-    html_code = f"""
-    <html>
-    <head>
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script>
-        <style>
-            :root {{
-                --bg-color: #F7F3F0;
-                --card-bg: #EFE9E4;
-                --text-primary: #4A3F35;
-                --text-secondary: #7A6F66;
-                --accent-color: #8B5E3C;
-                --highlight-bg: rgba(139, 94, 60, 0.1);
-            }}
-            html, body {{ height: 100%; margin: 0; padding: 0; overflow: hidden; background: var(--bg-color); font-family: sans-serif; display: flex; color: var(--text-primary); }}
-            #main-container {{ flex: 1; display: flex; flex-direction: column; border-right: 1px solid #D1C4B9; position: relative; }}
-            #right-panel {{ width: 320px; display: flex; flex-direction: column; background: #F2EDE9; transition: width 0.3s; overflow: hidden; }}
-            #right-panel.collapsed {{ width: 0; }}
-            #header {{ flex: 0 0 auto; background: rgba(247, 243, 240, 0.95); padding: 15px 20px; border-bottom: 1px solid #D1C4B9; display: flex; flex-direction: column; gap: 10px; }}
-            .app-title {{ font-size: 18px; font-weight: 800; color: var(--accent-color); display: flex; justify-content: space-between; align-items: center; }}
-            audio {{ width: 100%; height: 35px; opacity: 0.8; }}
-            #transcript {{ flex: 1; overflow-y: auto; padding: 20px; scroll-behavior: smooth; }}
-            .segment {{ padding: 12px; margin-bottom: 8px; border-radius: 10px; cursor: pointer; color: var(--text-secondary); line-height: 1.5; font-size: 15px; border-left: 3px solid transparent; }}
-            .segment.active {{ background-color: var(--highlight-bg); border-left: 4px solid var(--accent-color); color: var(--text-primary); font-weight: 600; transform: scale(1.01); }}
-            #footer {{ flex: 0 0 auto; padding: 15px; background: var(--bg-color); border-top: 1px solid #D1C4B9; display: flex; justify-content: center; }}
-            #mark-btn {{ background: var(--accent-color); color: white; border: none; width: 90%; height: 50px; border-radius: 25px; font-size: 18px; font-weight: bold; cursor: pointer; box-shadow: 0 4px 15px rgba(139, 94, 60, 0.2); }}
-            .panel-header {{ padding: 15px; font-size: 14px; font-weight: bold; color: #8E8279; border-bottom: 1px solid #D1C4B9; display: flex; justify-content: space-between; align-items: center; }}
-            #records-list {{ flex: 1; overflow-y: auto; padding: 15px; }}
-            .record-card {{ background: #EFE9E4; padding: 12px; border-radius: 8px; margin-bottom: 10px; cursor: pointer; border: 1px solid #D1C4B9; transition: 0.2s; }}
-            .record-card:hover {{ border-color: var(--accent-color); background: #F7F3F0; }}
-            .record-text {{ font-size: 13px; color: #4A3F35; line-height: 1.4; display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; overflow: hidden; }}
-            
-            /* Product Section - Enhanced UI */
-            #product-section {{ padding: 15px; background: #EFE9E4; border-top: 1px solid #D1C4B9; max-height: 280px; overflow-y: auto; }}
-            .product-card {{ background: #F7F3F0; padding: 10px; border-radius: 10px; display: flex; gap: 12px; align-items: center; text-decoration: none; margin-bottom: 10px; border: 1px solid #D1C4B9; transition: 0.2s; }}
-            .product-card:hover {{ border-color: var(--accent-color); }}
-            .product-img-container {{ width: 50px; height: 50px; border-radius: 8px; overflow: hidden; background: #D1C4B9; flex-shrink: 0; position: relative; }}
-            .product-img {{ width: 100%; height: 100%; object-fit: cover; }}
-            .product-info {{ flex: 1; min-width: 0; }}
-            .product-name {{ font-size: 12px; color: #4A3F35; font-weight: bold; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
-            .product-price {{ font-size: 12px; color: var(--accent-color); margin-top: 2px; font-weight: bold; }}
-
-            /* Modals */
-            #poster-modal, #export-modal {{ display: none; position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0,0,0,0.95); z-index: 4000; align-items: center; justify-content: center; backdrop-filter: blur(15px); }}
-            #poster-wrapper, #export-wrapper {{ display: flex; flex-direction: column; align-items: center; gap: 20px; }}
-            #poster-content {{ width: 320px; height: 460px; border-radius: 20px; overflow: hidden; display: flex; flex-direction: column; padding: 40px; box-sizing: border-box; position: relative; }}
-            .poster-modern {{ background: #000; color: #FFF; justify-content: center; }}
-            .poster-cyber {{ background: #0a0a0a; color: #0ff; justify-content: center; border: 2px solid #0ff; }}
-            .poster-zen {{ background: linear-gradient(180deg, #eef2f3 0%, #8e9eab 100%); color: #2c3e50; justify-content: center; }}
-            .poster-vintage {{ background: #fdfcf0; color: #4a3728; justify-content: center; border: 10px solid #e8e4c9; }}
-            #poster-text {{ font-size: 22px; font-weight: bold; line-height: 1.6; z-index: 2; }}
-
-            /* Book Style Export */
-            #export-content {{ width: 360px; max-height: 80vh; background: #FFF; color: #333; padding: 40px; border-radius: 4px; box-shadow: 0 10px 30px rgba(0,0,0,0.5); overflow-y: auto; font-family: serif; position: relative; }}
-            .book-title {{ font-size: 24px; font-weight: bold; border-bottom: 2px solid #333; padding-bottom: 10px; margin-bottom: 30px; text-align: center; }}
-            .book-quote {{ margin-bottom: 25px; position: relative; padding-left: 20px; border-left: 2px solid #EEE; }}
-            .book-quote-text {{ font-size: 15px; line-height: 1.6; font-style: italic; }}
-            .book-footer {{ margin-top: 40px; text-align: center; font-size: 12px; color: #AAA; border-top: 1px solid #EEE; padding-top: 20px; }}
-
-            #toast {{ position: fixed; top: 80px; left: 50%; transform: translateX(-50%); background: #4CAF50; color: white; padding: 10px 20px; border-radius: 20px; font-size: 14px; display: none; z-index: 3000; }}
-            .style-selector {{ display: flex; gap: 15px; background: rgba(255,255,255,0.1); padding: 12px 25px; border-radius: 40px; }}
-            .style-dot {{ width: 30px; height: 30px; border-radius: 50%; border: 3px solid transparent; cursor: pointer; transition: 0.3s; }}
-            .style-dot.active {{ border-color: var(--accent-color); transform: scale(1.2); }}
-        </style>
-    </head>
-    <body>
-        <div id="toast">✅ 记录成功，已存入灵感库</div>
-        <div id="main-container">
-            <div id="header">
-                <div class="app-title"><span>PodSnap ⚡️</span><i class="fas fa-bars" style="cursor:pointer; color: #666;" onclick="togglePanel()"></i></div>
-                <audio id="audio-player" controls><source src="data:audio/mp3;base64,{audio_b64}" type="audio/mp3"></audio>
-            </div>
-            <div id="transcript"></div>
-            <div id="footer"><button id="mark-btn" onclick="captureMoment()"><i class="fas fa-bookmark"></i> 记一下</button></div>
-        </div>
-        <div id="right-panel">
-            <div class="panel-header"><span>灵感库 <i class="fas fa-lightbulb" style="color: #FFD700;"></i></span><button onclick="openExport()" style="background:none; border:1px solid #444; color:#888; font-size:10px; padding:2px 8px; border-radius:10px; cursor:pointer;">导出全部</button></div>
-            <div id="records-list"><div style="color: #444; text-align: center; margin-top: 50px; font-size: 12px;">暂无记录</div></div>
-            <div id="product-section">
-                <div style="font-size: 10px; color: #666; margin-bottom: 10px;">基于内容推荐</div>
-                <div id="recs-container"></div>
-            </div>
-        </div>
-
-        <div id="poster-modal"><div id="poster-wrapper">
-            <div class="style-selector">
-                <div class="style-dot active" style="background: #000;" onclick="setStyle('modern', this)"></div>
-                <div class="style-dot" style="background: #0ff;" onclick="setStyle('cyber', this)"></div>
-                <div class="style-dot" style="background: #8e9eab;" onclick="setStyle('zen', this)"></div>
-                <div class="style-dot" style="background: #fdfcf0;" onclick="setStyle('vintage', this)"></div>
-            </div>
-            <div id="poster-content" class="poster-modern"><div id="poster-text"></div><div style="margin-top: 30px; font-size: 12px; opacity: 0.6;">—— 来自 PodSnap ⚡️</div></div>
-            <div style="display:flex; gap:15px;">
-                <button style="background: rgba(255,255,255,0.1); color: white; border: 1px solid #444; padding: 10px 25px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="closeModal()">返回</button>
-                <button style="background: var(--accent-color); color: white; border: none; padding: 10px 35px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="downloadImage('poster-content', 'PodSnap_Poster')">保存海报</button>
-            </div>
-        </div></div>
-
-        <div id="export-modal"><div id="export-wrapper">
-            <div id="export-content"><div class="book-title">PodSnap 读书笔记</div><div id="book-quotes-container"></div><div class="book-footer"><div style="font-weight:bold; color:#333;">PodSnap ⚡️</div><div style="font-size:10px;">记录每一个触动瞬间</div></div></div>
-            <div style="display:flex; gap:15px;">
-                <button style="background: rgba(255,255,255,0.1); color: white; border: 1px solid #444; padding: 10px 25px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="document.getElementById('export-modal').style.display='none'">返回</button>
-                <button style="background: var(--accent-color); color: white; border: none; padding: 10px 35px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="downloadImage('export-content', 'PodSnap_Notes')">分享笔记长图</button>
-            </div>
-        </div></div>
-
-        <script>
-            try {{
-                const parentDoc = window.parent.document;
-                const iframe = parentDoc.querySelector('iframe[title="streamlit.components.v1.components.html"]');
-                if (iframe) {{ iframe.style.position = 'fixed'; iframe.style.top = '0'; iframe.style.left = '0'; iframe.style.width = '100vw'; iframe.style.height = '100vh'; iframe.style.zIndex = '999999'; iframe.style.border = 'none'; }}
-            }} catch (e) {{}}
-            const transcriptData = {transcript_json};
-            const recsData = {recs_json};
-            const container = document.getElementById('transcript');
-            const player = document.getElementById('audio-player');
-            const recordsList = document.getElementById('records-list');
-            const recsContainer = document.getElementById('recs-container');
-            let currentSegment = null; let records = [];
-            
-            // Render Recommendations with Smart Images
-            recsData.forEach(item => {{
-                const a = document.createElement('a'); a.className = 'product-card'; a.href = "https://s.taobao.com/search?q=" + encodeURIComponent(item.name); a.target = "_blank";
-                a.innerHTML = `
-                    <div class="product-img-container" style="background: ${{item.color}}">
-                        <img class="product-img" src="${{item.img}}" onerror="this.style.display='none'">
-                        <div style="position:absolute; top:0; left:0; width:100%; height:100%; display:flex; align-items:center; justify-content:center; color:white; font-weight:bold; font-size:20px; z-index:-1">
-                            ${{item.name.replace(/《|》/g, '').charAt(0)}}
-                        </div>
-                    </div>
-                    <div class="product-info">
-                        <div class="product-name">${{item.name}}</div>
-                        <div class="product-price">¥ ${{item.price}}</div>
-                    </div>
-                    <i class="fas fa-chevron-right" style="color: #444; font-size: 10px;"></i>
-                `;
-                recsContainer.appendChild(a);
-            }});
-
-            transcriptData.forEach((seg, index) => {{
-                const div = document.createElement('div'); div.className = 'segment'; div.id = 'seg-' + index;
-                div.onclick = () => {{ player.currentTime = seg.start; player.play(); }};
-                div.innerHTML = `<span style="font-size: 10px; color: #555; display: block;">${{new Date(seg.start * 1000).toISOString().substr(14, 5)}}</span>${{seg.text}}`;
-                container.appendChild(div);
-            }});
-            player.ontimeupdate = () => {{
-                const time = player.currentTime; const activeIdx = transcriptData.findIndex(seg => time >= seg.start && time < seg.end);
-                if (activeIdx !== -1) {{ currentSegment = transcriptData[activeIdx]; document.querySelectorAll('.segment.active').forEach(el => el.classList.remove('active')); const activeEl = document.getElementById('seg-' + activeIdx); activeEl.classList.add('active'); activeEl.scrollIntoView({{ behavior: 'smooth', block: 'center' }}); }}
-            }};
-            function captureMoment() {{ if (!currentSegment) return; records.unshift({{ ...currentSegment, timestamp: new Date().toLocaleTimeString() }}); updateRecordsUI(); showToast(); }}
-            function updateRecordsUI() {{ recordsList.innerHTML = ''; records.forEach((rec, i) => {{ const div = document.createElement('div'); div.className = 'record-card'; div.onclick = () => openPoster(rec.text); div.innerHTML = `<div class="record-text">"${{rec.text}}"</div>`; recordsList.appendChild(div); }}); }}
-            function showToast() {{ const t = document.getElementById('toast'); t.style.display = 'block'; setTimeout(() => t.style.display = 'none', 2000); }}
-            function togglePanel() {{ document.getElementById('right-panel').classList.toggle('collapsed'); }}
-            function openPoster(text) {{ document.getElementById('poster-text').innerText = text; document.getElementById('poster-modal').style.display = 'flex'; setStyle('modern', document.querySelector('.style-dot')); }}
-            function setStyle(style, el) {{ document.getElementById('poster-content').className = 'poster-' + style; document.querySelectorAll('.style-dot').forEach(d => d.classList.remove('active')); el.classList.add('active'); }}
-            function closeModal() {{ document.getElementById('poster-modal').style.display = 'none'; }}
-            function openExport() {{
-                if (records.length === 0) {{ alert("灵感库还是空的哦"); return; }}
-                const container = document.getElementById('book-quotes-container'); container.innerHTML = '';
-                records.forEach(rec => {{ const div = document.createElement('div'); div.className = 'book-quote'; div.innerHTML = `<div class="book-quote-text">“${{rec.text}}”</div>`; container.appendChild(div); }});
-                document.getElementById('export-modal').style.display = 'flex';
-            }}
-            async function downloadImage(elementId, filename) {{ const element = document.getElementById(elementId); const canvas = await html2canvas(element, {{ scale: 2 }}); const link = document.createElement('a'); link.download = filename + '.png'; link.href = canvas.toDataURL('image/png'); link.click(); }}
-        </script>
-    </body>
-    </html>
-    """
-    components.html(html_code, height=750, scrolling=False)
+    # Rebuilt only when the transcript, audio or seek target changes; any other rerun resends the identical page
+    player = st.session_state.get('player')
+    if player is None or player['transcript'] is not st.session_state.transcript or player['key'] != (st.session_state.audio_file_path, st.session_state.seek_to):
+        player = {"transcript": st.session_state.transcript, "key": (st.session_state.audio_file_path, st.session_state.seek_to), **build_player(st.session_state.transcript, st.session_state.audio_file_path, st.session_state.seek_to, st.session_state.owner)}
+        st.session_state.player = player
+    else:
+        # Keep this session's transcript published (and fresh in the LRUs) for as long as its page points at it
+        publish_player(player['payload'])
+    components.html(player['html'], height=750, scrolling=False)
+
+# Background warm-up of the default model, started only after the first page has rendered
+get_model_registry()
+
+# --- Startup timing ---
+# Logged once per session: module import cost and time until the first full script run has rendered
+if 'startup_timing' not in st.session_state:
+    st.session_state.startup_timing = {"imports_ms": (_imports_done - _script_started) * 1000, "first_paint_ms": (time.perf_counter() - _script_started) * 1000}
+    logger.info("startup: imports %.0f ms, first paint %.0f ms", st.session_state.startup_timing["imports_ms"], st.session_state.startup_timing["first_paint_ms"])
@@ -0,0 +1 @@
+# PodSnap backend helpers (kept free of Streamlit so they can be reused by workers and scripts)
@@ -0,0 +1,131 @@
+import os
+import subprocess
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from podsnap.cache import DiskCache, file_digest
+
+SAMPLE_RATE = 16000
+
+
+def frame_energy(audio, frame=0.03, sr=SAMPLE_RATE, block=4096):
+    # RMS energy in dB per non-overlapping frame, `block` frames at a time so a memory-mapped episode is never
+    # squared into one full-size array
+    hop = int(frame * sr)
+    n = len(audio) // hop
+    energy = np.empty(n, dtype=np.float32)
+    for i in range(0, n, block):
+        j = min(n, i + block)
+        frames = np.asarray(audio[i * hop:j * hop], dtype=np.float32).reshape(j - i, hop)
+        energy[i:j] = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    return energy
+
+
+def find_split_points(audio, target=600.0, search=30.0, frame=0.03, sr=SAMPLE_RATE):
+    """Sample offsets roughly every `target` seconds, each moved to the quietest point within +-`search` s."""
+    total = len(audio) / sr
+    if total <= target * 1.5: return [0, len(audio)]
+    search = min(search, target / 4)
+    energy = frame_energy(audio, frame, sr)
+    # Smooth over ~0.3 s so a single quiet frame inside a word doesn't win
+    width = max(1, int(0.3 / frame))
+    energy = np.convolve(energy, np.ones(width) / width, mode="same")
+    points = [0]
+    t = target
+    while total - t > target / 2:
+        lo, hi = int((t - search) / frame), min(len(energy), int((t + search) / frame))
+        best = lo + int(np.argmin(energy[lo:hi]))
+        points.append(best * int(frame * sr))
+        t = best * frame + target
+    points.append(len(audio))
+    return points
+
+
+class PcmStore(DiskCache):
+    """Episodes decoded once to raw 16 kHz mono float32 and memory-mapped back, keyed by audio hash."""
+
+    def load(self, audio_path):
+        path = self.path_for(file_digest(audio_path), ".f32")
+        if not os.path.exists(path):
+            tmp = self.temp_path(path)
+            cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-i", audio_path, "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(SAMPLE_RATE), "-y", tmp]
+            try:
+                subprocess.run(cmd, capture_output=True, check=True)
+            except subprocess.CalledProcessError as e:
+                try: os.remove(tmp)
+                except OSError: pass
+                raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='ignore')}") from e
+            self.commit(tmp, path)
+        else:
+            self.touch(path)
+        if os.path.getsize(path) == 0: return np.zeros(0, dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="r")
+
+
+def speech_regions(audio, frame=0.03, min_silence=1.0, pad=0.2, sr=SAMPLE_RATE):
+    """Energy VAD: [(start_sample, end_sample)] of speech, merging pauses shorter than `min_silence`."""
+    if len(audio) < int(frame * sr): return [(0, len(audio))] if len(audio) else []
+    energy = frame_energy(audio, frame, sr)
+    # Threshold relative to the noise floor, kept under the loud frames when there is no floor (hardly any pauses),
+    # and never so low that hiss counts as speech
+    floor, loud = np.percentile(energy, [10, 90])
+    threshold = max(min(max(floor + 10, energy.max() - 45), loud - 10), -60)
+    voiced = np.concatenate([[False], energy > threshold, [False]])
+    edges = np.flatnonzero(voiced[1:] != voiced[:-1])
+    hop = int(frame * sr)
+    regions = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        start, end = max(0, int(start) * hop - int(pad * sr)), min(len(audio), int(end) * hop + int(pad * sr))
+        if regions and start - regions[-1][1] < min_silence * sr: regions[-1] = (regions[-1][0], end)
+        else: regions.append((start, end))
+    return regions
+
+
+class TimeMap:
+    """Maps times on the speech-only timeline back to the original episode timeline."""
+
+    def __init__(self, regions, sr=SAMPLE_RATE):
+        self.src = [a / sr for a, _ in regions]
+        self.dst, t = [], 0.0
+        for a, b in regions:
+            self.dst.append(t)
+            t += (b - a) / sr
+
+    def to_original(self, t, end=False):
+        # An end time sitting exactly on a cut belongs to the region before it
+        i = (bisect_left(self.dst, t) if end else bisect_right(self.dst, t)) - 1
+        i = max(0, i)
+        return self.src[i] + (t - self.dst[i])
+
+
+class SpeechAudio:
+    """The speech regions of `audio` read as one signal. Only what a slice asks for is copied out of `audio`
+    (typically a PCM memmap), so a job never holds its whole speech track in memory."""
+
+    def __init__(self, audio, regions):
+        self.audio, self.regions = audio, regions
+        self.offsets = [0]
+        for a, b in regions: self.offsets.append(self.offsets[-1] + b - a)
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step not in (None, 1): raise TypeError("only contiguous slices are supported")
+        start, stop, _ = index.indices(len(self))
+        parts = []
+        i = bisect_right(self.offsets, start) - 1
+        while start < stop and i < len(self.regions):
+            a, b = self.regions[i]
+            lo, hi = a + start - self.offsets[i], min(b, a + stop - self.offsets[i])
+            parts.append(self.audio[lo:hi])
+            start, i = start + hi - lo, i + 1
+        return np.concatenate(parts).astype(np.float32, copy=False) if parts else np.zeros(0, dtype=np.float32)
+
+
+def extract_speech(audio, min_gain=0.05, sr=SAMPLE_RATE):
+    """Returns (SpeechAudio, TimeMap), or (audio, None) when cutting silence would save less than `min_gain`."""
+    regions = speech_regions(audio, sr=sr)
+    if not regions or sum(b - a for a, b in regions) > (1 - min_gain) * len(audio): return audio, None
+    return SpeechAudio(audio, regions), TimeMap(regions, sr)
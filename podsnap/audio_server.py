@@ -0,0 +1,204 @@
+import gzip
+import json
+import mimetypes
+import os
+import re
+import secrets
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+_CHUNK = 256 * 1024
+_MAX_BODY = 64 * 1024
+_GZIP_MIN = 1024
+mimetypes.add_type("audio/mp4", ".m4a")
+mimetypes.add_type("audio/mpeg", ".mp3")
+mimetypes.add_type("audio/wav", ".wav")
+
+
+def parse_range(header, size):
+    # Returns (start, end) inclusive, None for "whole file", or raises ValueError if unsatisfiable
+    # Multiple ranges would need a multipart/byteranges reply; RFC 7233 lets us ignore the header instead
+    if not header or "," in header: return None
+    m = _RANGE.match(header.strip())
+    if not m or not (m.group(1) or m.group(2)): raise ValueError(header)
+    if not m.group(1):
+        length = int(m.group(2))
+        if length == 0: raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(m.group(1))
+    end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    if start >= size or end < start: raise ValueError(header)
+    return start, end
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self): self._serve(body=False)
+
+    def do_GET(self): self._serve(body=True)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, Range")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            self.send_error(413)
+            return
+        try: payload = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self.send_error(400)
+            return
+        self._route("post", payload)
+
+    def _route(self, method, *args):
+        # /<route>/<audio token>[?query]: per-episode JSON endpoints, authorised by the same random token as the audio
+        url_path, _, query = self.path.partition("?")
+        name, _, token = url_path.strip("/").partition("/")
+        handler = self.server.audio.routes.get(name, {}).get(method)
+        path = self.server.audio.resolve(f"/audio/{token}")
+        if handler is None or path is None:
+            self.send_error(404)
+            return
+        try:
+            body = handler(path, dict(parse_qsl(query)), *args)
+            # Handlers may return JSON they serialized (and memoized) themselves
+            if not isinstance(body, bytes): body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        except (KeyError, TypeError, ValueError):
+            self.send_error(400)
+            return
+        except FileNotFoundError:
+            # e.g. the audio was evicted from the store since its token was handed out
+            self.send_error(404)
+            return
+        except OSError:
+            self.send_error(500)
+            return
+        gzipped = len(body) >= _GZIP_MIN and "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if gzipped: body = gzip.compress(body, 6)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if gzipped: self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _page(self, render, content_type, body):
+        try: data = render().encode("utf-8")
+        except Exception:
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if body: self.wfile.write(data)
+
+    def _serve(self, body):
+        page = self.server.audio.pages.get(self.path.split("?", 1)[0].strip("/"))
+        if page is not None:
+            self._page(*page, body=body)
+            return
+        if not self.path.startswith("/audio/"):
+            if body: self._route("get")
+            else: self.send_error(405)
+            return
+        path = self.server.audio.resolve(self.path.split("?", 1)[0])
+        if path is None or not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        try: byte_range = parse_range(self.headers.get("Range"), size)
+        except ValueError:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start, end = byte_range or (0, size - 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if byte_range: self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "private, max-age=3600")
+        self.end_headers()
+        if not body: return
+        remaining = end - start + 1
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                while remaining > 0:
+                    chunk = f.read(min(_CHUNK, remaining))
+                    if not chunk: break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # Browsers routinely abort range requests when the user seeks
+            pass
+
+    def log_message(self, format, *args): pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Browsers drop keep-alive connections and abort range requests all the time; that is not worth a traceback
+        if isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)): return
+        super().handle_error(request, client_address)
+
+
+class AudioServer:
+    """Background HTTP server streaming registered audio files straight from disk, with Range support."""
+
+    def __init__(self, host, port):
+        self._files, self._tokens = {}, {}
+        self.routes, self.pages = {}, {}
+        self._lock = threading.Lock()
+        try: self._httpd = _Server((host, port), _Handler)
+        except OSError: self._httpd = _Server((host, 0), _Handler)
+        self._httpd.audio = self
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name="podsnap-audio-server", daemon=True).start()
+
+    def register(self, path):
+        # Random tokens so the URL doesn't leak local paths or let clients enumerate files
+        path = os.path.abspath(path)
+        with self._lock:
+            token = self._tokens.get(path)
+            if token is None:
+                token = secrets.token_urlsafe(16)
+                self._tokens[path], self._files[token] = token, path
+        return f"/audio/{token}{os.path.splitext(path)[1]}"
+
+    def route(self, name, get=None, post=None):
+        """Expose JSON endpoints at /<name>/<token>; handlers get the registered file path, the query parameters (and the POST body)
+        and return a JSON value or encoded JSON bytes."""
+        self.routes[name] = {"get": get, "post": post}
+
+    def page(self, name, render, content_type="text/plain; version=0.0.4; charset=utf-8"):
+        """Serve `render()` as plain text at /<name>, without a token (e.g. Prometheus metrics)."""
+        self.pages[name] = (render, content_type)
+
+    def resolve(self, url_path):
+        if not url_path.startswith("/audio/"): return None
+        token = os.path.splitext(url_path[len("/audio/"):])[0]
+        with self._lock: return self._files.get(token)
+
+    def shutdown(self):
+        self._httpd.shutdown()
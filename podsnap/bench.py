@@ -0,0 +1,261 @@
+"""Offline end-to-end benchmark of the import -> transcribe -> render pipeline.
+
+    python -m podsnap.bench [--lengths 30,120,600] [--tiers tiny,base] [--catalog-sizes 1000,10000,100000] [--out bench.json]
+
+Everything runs locally: audio fixtures are synthesized, and a local HTTP server stands in for podcast pages
+and audio hosts. Results are one JSON document with a flat `summary` for comparing runs.
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from podsnap import config
+from podsnap.audio import SAMPLE_RATE, PcmStore
+from podsnap.audio_server import AudioServer
+from podsnap.download import AudioStore, get_session, resolve_audio_url
+from podsnap.player import render_player, transcript_payload
+from podsnap.recommend import Recommender
+
+# Transcript text and catalog keywords share an 800-character alphabet, so keyword hits are sparse as in real episodes
+_CHARS = "".join(map(chr, range(0x4e00, 0x4e00 + 800)))
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS; children covers process-pool workers and ffmpeg
+    scale = 1 if sys.platform == "darwin" else 1024
+    own, children = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": round(own * scale / 2 ** 20, 1), "children": round(children * scale / 2 ** 20, 1)}
+
+
+def timed(fn, *args, repeat=1, **kwargs):
+    """(result, median seconds) over `repeat` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+# --- Fixtures ---
+def synth_speech(seconds, seed=0, sr=SAMPLE_RATE):
+    """Speech-like test signal: voiced syllables (harmonics under an envelope) in phrases separated by pauses."""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * sr), dtype=np.float32)
+    t = 0.0
+    while t < seconds:
+        phrase_end = min(seconds, t + rng.uniform(2.0, 8.0))
+        while t < phrase_end:
+            length = rng.uniform(0.12, 0.3)
+            n = int(length * sr)
+            lo = int(t * sr)
+            if lo + n > len(audio): break
+            f0 = rng.uniform(110, 240)
+            x = np.arange(n) / sr
+            voiced = sum(np.sin(2 * np.pi * f0 * k * x) / k for k in range(1, 6))
+            audio[lo:lo + n] += 0.2 * np.hanning(n) * voiced
+            t += length + rng.uniform(0.02, 0.08)
+        t = phrase_end + rng.uniform(0.3, 1.8)
+    audio += rng.normal(0, 0.003, len(audio)).astype(np.float32)
+    return np.clip(audio, -1, 1)
+
+
+def write_wav(path, audio, sr=SAMPLE_RATE):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1); w.setsampwidth(2); w.setframerate(sr)
+        w.writeframes((audio * 32767).astype("<i2").tobytes())
+    return path
+
+
+def synth_transcript(seconds, seed=0):
+    rng = random.Random(seed)
+    segments, t = [], 0.0
+    while t < seconds:
+        length = rng.uniform(2.0, 6.0)
+        text = "".join(rng.choice(_CHARS) for _ in range(int(length * 4)))
+        segments.append({"id": len(segments), "start": t, "end": min(seconds, t + length), "text": text, "tokens": list(range(int(length * 4)))})
+        t += length + rng.uniform(0.0, 0.5)
+    return segments
+
+
+def synth_catalog(size, seed=0):
+    rng = random.Random(seed)
+    return [{"keywords": ["".join(rng.choice(_CHARS) for _ in range(rng.randint(2, 4))) for _ in range(3)], "name": f"商品 {i}", "price": f"{rng.uniform(10, 500):.2f}", "tag": "product", "color": "#8B5E3C"} for i in range(size)]
+
+
+# --- Stages ---
+def bench_import(server, store, fixtures, parts):
+    """resolve_audio_url + AudioStore.fetch against the local stand-in, plus the upload write path."""
+    base = f"http://127.0.0.1:{server.port}"
+    session = get_session()
+    results = []
+    for fx in fixtures:
+        audio_path = server.register(fx["path"])
+        token = os.path.splitext(os.path.basename(audio_path))[0]
+        # A fresh query string per run so the resolve memo and the audio store start cold
+        page = f"{base}/episode/{token}?run={time.time_ns()}"
+        audio_url, resolve_s = timed(resolve_audio_url, page, session=session)
+        _, resolve_hit_s = timed(resolve_audio_url, page, session=session)
+        audio_url = f"{audio_url}?run={time.time_ns()}"
+        _, single_s = timed(store.fetch, audio_url + "&parts=1", session=session, parts=1)
+        # Files under MIN_PARALLEL_BYTES are fetched in one part whatever was asked for: report what was used
+        used = {}
+        _, parallel_s = timed(store.fetch, audio_url + f"&parts={parts}", session=session, parts=parts, info=used)
+        _, cached_s = timed(store.fetch, audio_url + f"&parts={parts}", session=session, parts=parts)
+        with open(fx["path"], "rb") as f: data = f.read() + time.time_ns().to_bytes(8, "little")
+        _, upload_s = timed(store.put_bytes, data, ".wav")
+        mb = fx["bytes"] / 2 ** 20
+        results.append({
+            "seconds": fx["seconds"], "bytes": fx["bytes"], "resolve_ms": resolve_s * 1000, "resolve_memo_ms": resolve_hit_s * 1000,
+            "download_single_ms": single_s * 1000, "download_parallel_ms": parallel_s * 1000, "download_parallel_parts": used["parts"],
+            "download_cached_ms": cached_s * 1000, "download_mb_s": mb / parallel_s, "upload_write_ms": upload_s * 1000,
+        })
+    return results
+
+
+def _ensure_ffmpeg(bin_dir):
+    if shutil.which("ffmpeg"): return True
+    try: import imageio_ffmpeg
+    except ImportError: return False
+    os.makedirs(bin_dir, exist_ok=True)
+    target = os.path.join(bin_dir, "ffmpeg")
+    if not os.path.exists(target): os.symlink(imageio_ffmpeg.get_ffmpeg_exe(), target)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+    return True
+
+
+def bench_transcribe(fixtures, tiers, workdir):
+    """Real-time factor per tier through the same InferenceService the app uses (decode + VAD + batched inference)."""
+    try:
+        import whisper  # noqa: F401
+    except ImportError as e:
+        return {"skipped": f"whisper unavailable: {e}"}
+    if not _ensure_ffmpeg(os.path.join(workdir, "bin")): return {"skipped": "ffmpeg unavailable"}
+    from podsnap.inference import InferenceService
+    from podsnap.models import ModelRegistry
+    registry = ModelRegistry(tiers, quantize=config.QUANTIZE, fallback_depth=0)
+    results = []
+    for tier in tiers:
+        try: _, load_s = timed(registry.get, tier)
+        except Exception as e:
+            results.append({"tier": tier, "error": f"model load failed: {e}"})
+            continue
+        for fx in fixtures:
+            # A fresh PCM store per run so ffmpeg decoding is part of the measurement
+            service = InferenceService(registry, max_active=1, batch_size=config.BATCH_SIZE, pcm_store=PcmStore(os.path.join(workdir, f"pcm-{tier}-{fx['seconds']}"), 1 << 40), vad=config.VAD)
+            try:
+                start = time.perf_counter()
+                job = service.submit(fx["path"], tier, language=config.LANGUAGE, initial_prompt=config.INITIAL_PROMPT)
+                job.wait()
+                elapsed = time.perf_counter() - start
+            finally:
+                service.shutdown()
+            result = {"tier": tier, "seconds": fx["seconds"], "quantized": config.QUANTIZE, "vad": config.VAD, "model_load_ms": load_s * 1000, "elapsed_ms": elapsed * 1000, "rtf": elapsed / fx["seconds"], "segments": len(job.segments), "status": job.status, "peak_rss_mb": peak_rss_mb()}
+            if job.error is not None: result["error"] = str(job.error)
+            results.append(result)
+    return results
+
+
+def bench_render(lengths):
+    """Size and build time of the player page and of the transcript payload it fetches."""
+    results = []
+    for seconds in lengths:
+        segments = synth_transcript(seconds)
+        def build():
+            _, payload = transcript_payload(segments)
+            return payload, render_player("/transcript/token?v=0", [], "/audio/token.mp3", "/quotes/token", None, config.AUDIO_PORT)
+        (payload, html), build_s = timed(build, repeat=5)
+        results.append({
+            "seconds": seconds, "segments": len(segments), "build_ms": build_s * 1000, "html_bytes": len(html.encode("utf-8")),
+            "transcript_bytes": len(payload), "transcript_gzip_bytes": len(gzip.compress(payload, 6)),
+            "inline_transcript_bytes": len(json.dumps(segments).encode("utf-8")),
+        })
+    return results
+
+
+def bench_recommend(sizes, text_seconds=7200, repeat=5):
+    """Recommender build time and recommend() latency on a long episode's text, per catalog size."""
+    text = " ".join(s["text"] for s in synth_transcript(text_seconds, seed=1))
+    results = []
+    for size in sizes:
+        catalog = synth_catalog(size)
+        recommender, build_s = timed(Recommender, catalog)
+        _, recommend_s = timed(recommender.recommend, text, repeat=repeat)
+        results.append({"catalog_size": size, "text_chars": len(text), "build_ms": build_s * 1000, "recommend_ms": recommend_s * 1000, "peak_rss_mb": peak_rss_mb()})
+    return results
+
+
+def run(lengths=(30, 120, 600), tiers=("tiny",), catalog_sizes=(1000, 10000, 100000), parts=config.DOWNLOAD_PARTS):
+    workdir = tempfile.mkdtemp(prefix="podsnap-bench-")
+    try:
+        fixtures = []
+        for i, seconds in enumerate(lengths):
+            path = write_wav(os.path.join(workdir, f"fixture-{seconds}s.wav"), synth_speech(seconds, seed=i))
+            fixtures.append({"seconds": seconds, "path": path, "bytes": os.path.getsize(path)})
+        # The stand-in serves each fixture as an "episode page" that links to its Range-capable audio URL
+        server = AudioServer("127.0.0.1", 0)
+        server.route("episode", get=lambda path, query: {"enclosure": f"http://127.0.0.1:{server.port}{server.register(path)}"})
+        store = AudioStore(os.path.join(workdir, "audio"), 1 << 40)
+        report = {"meta": {
+            "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(), "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "config": {"batch_size": config.BATCH_SIZE, "quantize": config.QUANTIZE, "vad": config.VAD, "download_parts": parts, "torch_threads": config.TORCH_THREADS},
+        }}
+        report["import"] = bench_import(server, store, fixtures, parts)
+        report["render"] = bench_render(lengths)
+        report["recommend"] = bench_recommend(catalog_sizes)
+        report["transcribe"] = bench_transcribe(fixtures, tiers, workdir)
+        server.shutdown()
+        report["peak_rss_mb"] = peak_rss_mb()
+        report["summary"] = summarize(report)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def summarize(report):
+    # Flat name -> number map, convenient for diffing two runs
+    summary = {}
+    for r in report["import"]:
+        for k in ("resolve_ms", "download_parallel_ms", "download_mb_s", "upload_write_ms"): summary[f"import.{r['seconds']}s.{k}"] = round(r[k], 3)
+    for r in report["render"]:
+        for k in ("build_ms", "html_bytes", "transcript_gzip_bytes"): summary[f"render.{r['seconds']}s.{k}"] = round(r[k], 3)
+    for r in report["recommend"]:
+        for k in ("build_ms", "recommend_ms"): summary[f"recommend.{r['catalog_size']}.{k}"] = round(r[k], 3)
+    if isinstance(report["transcribe"], list):
+        for r in report["transcribe"]:
+            if "rtf" in r: summary[f"transcribe.{r['tier']}.{r['seconds']}s.rtf"] = round(r["rtf"], 4)
+    summary["peak_rss_mb"] = report["peak_rss_mb"]["self"]
+    return summary
+
+
+def main(argv=None):
+    ints = lambda s: tuple(int(x) for x in s.split(",") if x)
+    parser = argparse.ArgumentParser(description="Offline PodSnap pipeline benchmark")
+    parser.add_argument("--lengths", type=ints, default=(30, 120, 600), help="fixture lengths in seconds")
+    parser.add_argument("--tiers", type=lambda s: tuple(x for x in s.split(",") if x), default=("tiny",), help="Whisper tiers to time (empty to skip)")
+    parser.add_argument("--catalog-sizes", type=ints, default=(1000, 10000, 100000))
+    parser.add_argument("--parts", type=int, default=config.DOWNLOAD_PARTS)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    report = run(args.lengths, args.tiers, args.catalog_sizes, args.parts)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    # Content hash of an audio file, memoized by (path, size, mtime) so reruns don't re-read it
+    info = os.stat(path)
+    memo_key = (os.path.abspath(path), info.st_size, info.st_mtime_ns)
+    with _digest_lock:
+        if memo_key in _digest_memo: return _digest_memo[memo_key]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""): h.update(chunk)
+    digest = h.hexdigest()
+    with _digest_lock: _digest_memo[memo_key] = digest
+    return digest
+
+
+class DiskCache:
+    """Directory of content-addressed files, size-bounded with LRU eviction (mtime = last use)."""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, key, suffix=""):
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    def touch(self, path):
+        try: os.utime(path, None)
+        except OSError: pass
+
+    def temp_path(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def commit(self, tmp_path, path):
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None, stale_tmp_after=24 * 3600):
+        with self._lock:
+            entries, total = [], 0
+            now = time.time()
+            for dirpath, _, names in os.walk(self.root):
+                for name in names:
+                    p = os.path.join(dirpath, name)
+                    try: info = os.stat(p)
+                    except OSError: continue
+                    if name.endswith(".tmp"):
+                        # In-flight writes and resumable partial downloads, unless abandoned long ago
+                        if now - info.st_mtime > stale_tmp_after:
+                            try: os.remove(p)
+                            except OSError: pass
+                        continue
+                    entries.append((info.st_mtime, info.st_size, p))
+                    total += info.st_size
+            if total <= self.max_bytes: return
+            entries.sort()
+            for _, size, p in entries:
+                if total <= self.max_bytes: break
+                if p == keep: continue
+                try: os.remove(p)
+                except OSError: continue
+                total -= size
+
+
+def compact_segments(segments):
+    # The player only reads start/end/text; drop Whisper's tokens, logprobs etc.
+    return [{"id": i, "start": round(float(s["start"]), 3), "end": round(float(s["end"]), 3), "text": s["text"]} for i, s in enumerate(segments)]
+
+
+def segment_columns(segments):
+    """Columnar {start, end, text} form of compact_segments(), as stored in the cache and fetched by the player."""
+    segments = compact_segments(segments)
+    return {"start": [s["start"] for s in segments], "end": [s["end"] for s in segments], "text": [s["text"] for s in segments]}
+
+
+class TranscriptCache(DiskCache):
+    """Transcripts keyed by audio hash + model settings, stored as gzipped columnar JSON."""
+
+    def make_key(self, audio_digest, **settings):
+        raw = json.dumps([audio_digest, sorted(settings.items())], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        path = self.path_for(key, ".json.gz")
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f: cols = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            try: os.remove(path)
+            except OSError: pass
+            return None
+        self.touch(path)
+        return [{"id": i, "start": s, "end": e, "text": t} for i, (s, e, t) in enumerate(zip(cols["start"], cols["end"], cols["text"]))]
+
+    def put(self, key, segments):
+        segments = compact_segments(segments)
+        cols = segment_columns(segments)
+        path = self.path_for(key, ".json.gz")
+        tmp = self.temp_path(path)
+        with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(cols, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self.commit(tmp, path)
+        return segments
@@ -0,0 +1,66 @@
+import os
+
+# --- Paths ---
+CACHE_DIR = os.environ.get("PODSNAP_CACHE_DIR", os.path.join(os.getcwd(), "cache"))
+
+# --- Transcription ---
+WHISPER_MODEL = os.environ.get("PODSNAP_MODEL", "base")
+LANGUAGE = "zh"
+INITIAL_PROMPT = "请使用简体中文进行转写。"
+
+# --- Cache limits (MB) ---
+TRANSCRIPT_CACHE_MB = int(os.environ.get("PODSNAP_TRANSCRIPT_CACHE_MB", "256"))
+
+# --- Parallel transcription (process pool, used for long episodes only) ---
+WORKERS = int(os.environ.get("PODSNAP_WORKERS", "1"))
+TORCH_THREADS = int(os.environ.get("PODSNAP_TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // max(1, WORKERS))
+PARALLEL_MIN_SECONDS = float(os.environ.get("PODSNAP_PARALLEL_MIN_SECONDS", "600"))
+
+# --- Audio streaming endpoint ---
+# Loopback only by default: remote browsers use AUDIO_BASE_URL (a proxy) or the static fallback below
+AUDIO_HOST = os.environ.get("PODSNAP_AUDIO_HOST", "127.0.0.1")
+AUDIO_PORT = int(os.environ.get("PODSNAP_AUDIO_PORT", "8502"))
+# Public origin of the audio server when it sits behind a proxy, e.g. "https://example.com/podsnap-audio"
+AUDIO_BASE_URL = os.environ.get("PODSNAP_AUDIO_BASE_URL", "")
+# Copies of player audio/transcripts under ./static, served by Streamlit itself when the browser cannot reach the audio
+# server (needs server.enableStaticServing; Streamlit turns that off for static folders over 1 GB). 0 disables
+STATIC_MIRROR_MB = int(os.environ.get("PODSNAP_STATIC_MIRROR_MB", "768"))
+
+# --- Downloads ---
+AUDIO_STORE_MB = int(os.environ.get("PODSNAP_AUDIO_STORE_MB", "2048"))
+DOWNLOAD_PARTS = int(os.environ.get("PODSNAP_DOWNLOAD_PARTS", "4"))
+
+# --- Recommendations ---
+# JSON list or JSON-lines file of {"keywords": [...], "name", "price", "tag", "color"[, "img"]}
+CATALOG_PATH = os.environ.get("PODSNAP_CATALOG", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "catalog.json"))
+
+# --- Shared inference service ---
+QUEUE_SIZE = int(os.environ.get("PODSNAP_QUEUE_SIZE", "16"))
+MAX_ACTIVE_JOBS = int(os.environ.get("PODSNAP_MAX_ACTIVE_JOBS", "2"))
+BATCH_SIZE = int(os.environ.get("PODSNAP_BATCH_SIZE", "4"))
+
+# --- Preprocessing ---
+PCM_CACHE_MB = int(os.environ.get("PODSNAP_PCM_CACHE_MB", "2048"))
+# Skip silence/pauses before inference (energy-based VAD)
+VAD = os.environ.get("PODSNAP_VAD", "1") != "0"
+
+# --- Model tiers ---
+MODEL_TIERS = tuple(os.environ.get("PODSNAP_MODEL_TIERS", "tiny,base,small").split(","))
+# Dynamically quantized int8 Linear layers on CPU: faster, slightly less accurate
+QUANTIZE = os.environ.get("PODSNAP_QUANTIZE", "0") == "1"
+# Drop one tier for every this many queued jobs (0 disables)
+FALLBACK_QUEUE_DEPTH = int(os.environ.get("PODSNAP_FALLBACK_QUEUE_DEPTH", "4"))
+# Warmed in the background at startup. Fallback only picks loaded tiers (a deep queue starts loading the one it wanted),
+# so by default every tier below the configured one is preloaded after it
+_SMALLER = MODEL_TIERS[:MODEL_TIERS.index(WHISPER_MODEL)][::-1] if FALLBACK_QUEUE_DEPTH and WHISPER_MODEL in MODEL_TIERS else ()
+PRELOAD_MODELS = tuple(m for m in os.environ.get("PODSNAP_PRELOAD_MODELS", ",".join((WHISPER_MODEL,) + _SMALLER)).split(",") if m)
+
+# --- Metrics ---
+# Prometheus text exposition at /metrics on the audio server (opt-in: it has no authentication), and/or rewritten
+# to this file after every stage
+METRICS_ENDPOINT = os.environ.get("PODSNAP_METRICS_ENDPOINT", "0") == "1"
+METRICS_FILE = os.environ.get("PODSNAP_METRICS_FILE", "")
+# Sample the inference thread of every job and keep folded stacks for jobs slower than this (0 disables). The thread is
+# shared, so with several active jobs each profile also holds the others' work; process-pool jobs are not profiled
+PROFILE_SLOW_SECONDS = float(os.environ.get("PODSNAP_PROFILE_SLOW_SECONDS", "0"))
+PROFILE_DIR = os.environ.get("PODSNAP_PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
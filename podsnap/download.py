@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from podsnap.cache import DiskCache
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'}
+TIMEOUT = (5, 30)
+BUFFER_SIZE = 1 << 20
+MIN_PARALLEL_BYTES = 4 << 20
+_AUDIO_URL = re.compile(r'https?://[^\s"\'\\]+\.(?:mp3|m4a|wav)[^\s"\'\\]*')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # One pooled session per process so repeat requests reuse keep-alive connections
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET", "HEAD"]))
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+class _Memo:
+    """Small thread-safe LRU with expiry, for page URL -> audio URL lookups."""
+
+    def __init__(self, max_items=512, ttl=6 * 3600):
+        self.max_items, self.ttl = max_items, ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None or hit[1] < time.monotonic(): return None
+            self._items.move_to_end(key)
+            return hit[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items: self._items.popitem(last=False)
+
+
+_resolved = _Memo()
+
+
+def resolve_audio_url(url, session=None):
+    """Find the first audio file URL in a podcast page. Raises on HTTP errors, returns None if nothing is found."""
+    cached = _resolved.get(url)
+    if cached: return cached
+    response = (session or get_session()).get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    audio_match = _AUDIO_URL.search(response.text)
+    if not audio_match: return None
+    audio_url = audio_match.group(0).replace('\\u002F', '/')
+    _resolved.put(url, audio_url)
+    return audio_url
+
+
+def audio_suffix(url):
+    lowered = url.lower()
+    if ".m4a" in lowered: return ".m4a"
+    if ".wav" in lowered: return ".wav"
+    return ".mp3"
+
+
+def _probe(session, url):
+    # A one-byte range GET tells us size, range support and a validator even where HEAD is broken
+    with session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        if r.status_code == 206 and "/" in r.headers.get("Content-Range", ""):
+            total = r.headers["Content-Range"].rsplit("/", 1)[1]
+            size, ranges = (int(total) if total.isdigit() else None), True
+        else:
+            size, ranges = int(r.headers.get("Content-Length") or 0) or None, False
+        validator = r.headers.get("ETag") or f"{r.headers.get('Last-Modified', '')}|{size}"
+        return r.url, size, ranges, validator
+
+
+class AudioStore(DiskCache):
+    """Downloaded and uploaded episodes, keyed by URL + ETag (or content hash for uploads)."""
+
+    def __init__(self, root, max_bytes):
+        super().__init__(root, max_bytes)
+        self._key_locks = {}
+
+    def _key_lock(self, key):
+        with self._lock: return self._key_locks.setdefault(key, threading.Lock())
+
+    def put_bytes(self, data, suffix):
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path_for(key, suffix)
+        if os.path.exists(path):
+            self.touch(path)
+            return path
+        tmp = self.temp_path(path)
+        with open(tmp, "wb") as f: f.write(data)
+        return self.commit(tmp, path)
+
+    def fetch(self, url, session=None, parts=4, progress=None, info=None):
+        """Download `url` into the store (or return the stored copy), resuming any interrupted earlier attempt.
+
+        `progress(done_bytes, total_bytes)` is called from the calling thread only. `info` (e.g. a metrics stage dict)
+        gets the number of parts actually used: 1 below MIN_PARALLEL_BYTES or without range support, 0 for a stored copy.
+        """
+        session = session or get_session()
+        final_url, size, ranges, validator = _probe(session, url)
+        key = hashlib.sha256(f"{url}\n{validator}".encode("utf-8")).hexdigest()
+        path = self.path_for(key, audio_suffix(url))
+        with self._key_lock(key):
+            used = 0 if os.path.exists(path) else parts if size and ranges and size >= MIN_PARALLEL_BYTES else 1
+            if info is not None: info["parts"] = used
+            if not used:
+                self.touch(path)
+                return path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            part, state_path = path + ".part.tmp", path + ".state.tmp"
+            if size and ranges: self._fetch_ranges(session, final_url, size, validator, part, state_path, used, progress)
+            else: self._fetch_whole(session, final_url, part, progress)
+            try: os.remove(state_path)
+            except OSError: pass
+            return self.commit(part, path)
+
+    def _fetch_whole(self, session, url, part, progress):
+        done = 0
+        with session.get(url, stream=True, timeout=TIMEOUT) as r, open(part, "wb", buffering=BUFFER_SIZE) as f:
+            r.raise_for_status()
+            total = int(r.headers.get("Content-Length") or 0)
+            for chunk in r.iter_content(chunk_size=BUFFER_SIZE):
+                f.write(chunk)
+                done += len(chunk)
+                if progress: progress(done, total)
+
+    def _fetch_ranges(self, session, url, size, validator, part, state_path, parts, progress):
+        bounds = [size * i // parts for i in range(parts + 1)]
+        state = {"validator": validator, "size": size, "done": [0] * parts}
+        try:
+            with open(state_path) as f: saved = json.load(f)
+            if saved["validator"] == validator and saved["size"] == size and len(saved["done"]) == parts and os.path.getsize(part) == size: state = saved
+        except (OSError, ValueError, KeyError): pass
+        if state["done"] == [0] * parts:
+            with open(part, "wb") as f: f.truncate(size)
+        state_lock, stop = threading.Lock(), threading.Event()
+        # `live` counts bytes handed to the file for progress; `state["done"]` only what has been flushed
+        live = list(state["done"])
+
+        def save_state():
+            with state_lock:
+                tmp = state_path + ".tmp"
+                with open(tmp, "w") as f: json.dump(state, f)
+                os.replace(tmp, state_path)
+
+        def fetch_part(i):
+            offset, end = bounds[i] + state["done"][i], bounds[i + 1]
+            if offset >= end: return
+            with session.get(url, headers={"Range": f"bytes={offset}-{end - 1}"}, stream=True, timeout=TIMEOUT) as r, open(part, "r+b", buffering=BUFFER_SIZE) as f:
+                r.raise_for_status()
+                if r.status_code != 206: raise IOError(f"server ignored range request ({r.status_code})")
+                f.seek(offset)
+                try:
+                    for chunk in r.iter_content(chunk_size=BUFFER_SIZE):
+                        if stop.is_set(): break
+                        chunk = chunk[:end - offset]
+                        f.write(chunk)
+                        offset += len(chunk)
+                        live[i] = offset - bounds[i]
+                        if offset >= end: break
+                        if live[i] - state["done"][i] >= 8 * BUFFER_SIZE:
+                            f.flush()
+                            state["done"][i] = live[i]
+                            save_state()
+                finally:
+                    f.flush()
+                    state["done"][i] = offset - bounds[i]
+
+        with ThreadPoolExecutor(max_workers=parts, thread_name_prefix="podsnap-download") as pool:
+            futures = [pool.submit(fetch_part, i) for i in range(parts)]
+            pending = set(futures)
+            try:
+                while pending:
+                    finished, pending = wait(pending, timeout=0.2, return_when=FIRST_EXCEPTION)
+                    for future in finished: future.result()
+                    if progress: progress(sum(live), size)
+            except BaseException:
+                stop.set()
+                raise
+            finally:
+                # Keep whatever made it to disk so the next attempt resumes instead of starting over
+                wait(futures)
+                save_state()
+        if sum(state["done"]) != size: raise IOError(f"incomplete download: {sum(state['done'])}/{size} bytes")
@@ -0,0 +1,290 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import closing
+
+from podsnap import metrics
+from podsnap.audio import SAMPLE_RATE, extract_speech
+from podsnap.transcribe import commit_segments, decode_windows, iter_windows
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Handle for one transcription request. Shared by every session that asked for the same audio."""
+
+    def __init__(self, service, audio_path, cache_key, model, options, title=None):
+        self.id = uuid.uuid4().hex
+        self.audio_path = audio_path
+        self.title = title
+        self.model = model
+        self.cache_key = cache_key
+        self.options = options
+        self.segments = []
+        self.progress = 0.0
+        self.status = "queued"
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.audio_seconds = None
+        self._service = service
+        self._watchers = 1
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._windows = None
+        self._previous = None
+        self._timemap = None
+        self._profiler = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def position(self):
+        """1-based place in the queue, 0 once the job is running or finished."""
+        return self._service.position(self)
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        # Only actually stops once every session sharing this job has let go of it
+        self._service.release(self)
+
+
+class InferenceService:
+    """Process-wide transcription service: bounded queue, limited concurrency, batched window decoding.
+
+    One scheduler thread runs all inference. Each round it takes windows round-robin from the running jobs
+    and decodes up to `batch_size` of them in a single forward pass, so concurrent users share the CPU
+    instead of fighting over it. Long episodes may instead go to the process pool, one at a time.
+    """
+
+    def __init__(self, registry, cache=None, max_queue=16, max_active=2, batch_size=4, pool=None, pool_min_seconds=600.0, pcm_store=None, vad=True, on_done=None, profile_slow=0.0, profile_dir=None):
+        self.max_queue, self.max_active, self.batch_size = max_queue, max_active, batch_size
+        self.pool, self.pool_min_seconds = pool, pool_min_seconds
+        self._pcm_store, self.vad = pcm_store, vad
+        self.registry = registry
+        self._cache = cache
+        # Called from the scheduler with each successfully finished job (e.g. to index it for search)
+        self._on_done = on_done
+        # Jobs running longer than `profile_slow` seconds leave a folded-stack profile in `profile_dir`
+        self.profile_slow, self.profile_dir = profile_slow, profile_dir
+        self._cond = threading.Condition()
+        self._pending, self._active, self._inflight = deque(), [], {}
+        self._pool_busy, self._closed = False, False
+        self._thread = threading.Thread(target=self._run, name="podsnap-inference", daemon=True)
+        self._thread.start()
+
+    # --- Public API ---
+    def effective_model(self, name):
+        """The tier a job asking for `name` would get right now (smaller ones while the queue is deep)."""
+        with self._cond: depth = len(self._pending)
+        return self.registry.fallback(name, depth)
+
+    def submit(self, audio_path, model, cache_key=None, language=None, initial_prompt=None, title=None):
+        """Queue a job (or join the in-flight one for the same cache key). Raises queue.Full when saturated.
+
+        `model` is used as given; callers pick it with effective_model() so it matches their cache key.
+        """
+        with self._cond:
+            job = self._inflight.get(cache_key) if cache_key else None
+            if job is not None and not job.done:
+                job._watchers += 1
+                return job
+            if self._closed: raise RuntimeError("inference service is shut down")
+            if len(self._pending) >= self.max_queue: raise queue.Full
+            job = Job(self, audio_path, cache_key, model, {"language": language, "initial_prompt": initial_prompt}, title)
+            self._pending.append(job)
+            if cache_key: self._inflight[cache_key] = job
+            self._cond.notify_all()
+            return job
+
+    def position(self, job):
+        with self._cond:
+            try: return self._pending.index(job) + 1
+            except ValueError: return 0
+
+    def release(self, job):
+        with self._cond:
+            job._watchers -= 1
+            if job._watchers > 0 or job.done: return
+            job._cancelled.set()
+            if job in self._pending: self._finish(job, "cancelled")
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond: return {"queued": len(self._pending), "active": len(self._active)}
+
+    def shutdown(self, timeout=None):
+        """Stop the scheduler thread after its current round; queued and running jobs end up "cancelled"."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    # --- Scheduler ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._active and not self._closed: self._cond.wait()
+                if self._closed:
+                    leftover = list(self._pending) + self._active
+                    break
+                admitted = []
+                while self._pending and len(self._active) + len(admitted) < self.max_active: admitted.append(self._pending.popleft())
+            for job in admitted:
+                try: self._start(job)
+                except Exception as e: self._fail([job], e)
+            batch = []
+            try:
+                batch = self._next_batch()
+                if batch: self._decode(batch)
+                else:
+                    # Only pool jobs are running: sleep until something changes
+                    with self._cond: self._cond.wait(timeout=0.5)
+            except Exception as e:
+                # One bad round must not stop the service: fail the jobs it touched (every running one if unknown)
+                with self._cond: running = [job for job in self._active if job._windows is not None]
+                self._fail({job for job, _ in batch} or running, e)
+        for job in leftover:
+            job._cancelled.set()
+            self._finish(job, "cancelled")
+
+    def _fail(self, jobs, error):
+        logger.exception("transcription failed for %d job(s)", len(jobs))
+        for job in jobs: self._finish(job, "failed", error)
+
+    def _load_audio(self, path):
+        if self._pcm_store is not None: return self._pcm_store.load(path)
+        import whisper
+        return whisper.load_audio(path)
+
+    def _start(self, job):
+        job.status, job.started_at = "running", time.monotonic()
+        metrics.record("queue_wait", job.started_at - job.submitted_at, job=job.id)
+        # Batched decoding runs on this scheduler thread, so that is the thread worth sampling. It is shared: a job's
+        # profile also holds whatever the other active jobs decoded meanwhile (batches mix their windows anyway)
+        if self.profile_slow and self.profile_dir: job._profiler = metrics.SamplingProfiler().start()
+        try:
+            with metrics.stage("decode", job=job.id) as info:
+                audio = self._load_audio(job.audio_path)
+                job.audio_seconds = info["audio_seconds"] = len(audio) / SAMPLE_RATE
+                # Metrics only: never fail a job over them
+                try: info["bytes"] = os.path.getsize(job.audio_path)
+                except OSError: pass
+            # Only speech goes to the model; segments are mapped back to the episode timeline in _emit
+            if self.vad: audio, job._timemap = extract_speech(audio)
+        except Exception as e:
+            self._finish(job, "failed", e)
+            return
+        with self._cond:
+            self._active.append(job)
+            use_pool = self.pool is not None and self.pool.model_name == job.model and not self._pool_busy and len(audio) / SAMPLE_RATE >= self.pool_min_seconds
+            if use_pool: self._pool_busy = True
+        if use_pool and job._profiler is not None:
+            # The work happens in another process; sampling this thread would only show other jobs
+            job._profiler.stop()
+            job._profiler = None
+        if use_pool: threading.Thread(target=self._run_pool_job, args=(job, audio), name="podsnap-pool-job", daemon=True).start()
+        else: job._windows = iter_windows(audio)
+
+    def _next_batch(self):
+        batch = []
+        with self._cond:
+            jobs = [job for job in self._active if job._windows is not None]
+            if self._active: self._active.append(self._active.pop(0))
+        exhausted = set()
+        while len(batch) < self.batch_size and len(exhausted) < len(jobs):
+            for job in jobs:
+                if job in exhausted or len(batch) >= self.batch_size: continue
+                if job._cancelled.is_set():
+                    exhausted.add(job)
+                    self._finish(job, "cancelled")
+                    continue
+                window = next(job._windows, None)
+                if window is None:
+                    exhausted.add(job)
+                    # If its last window is in this batch, _decode finishes the job afterwards
+                    if not any(j is job for j, _ in batch): self._finish(job, "done")
+                    continue
+                batch.append((job, window))
+        return batch
+
+    def _decode(self, batch):
+        # Windows sharing a model, language and prompt decode together. The prompt is only the configured
+        # initial prompt: carrying each window's predecessor text (as sequential decoding did) would give every
+        # window its own prompt, and a job's next window is often in the same batch as the one it would follow.
+        groups = {}
+        for i, (job, _) in enumerate(batch): groups.setdefault((job.model, job.options["language"], job.options["initial_prompt"]), []).append(i)
+        results = [None] * len(batch)
+        try:
+            for (model, language, prompt), indexes in groups.items():
+                for i, segments in zip(indexes, decode_windows(self.registry.get(model), [batch[i][1][1] for i in indexes], language=language, initial_prompt=prompt)): results[i] = segments
+        except Exception as e:
+            for job in {job for job, _ in batch}: self._finish(job, "failed", e)
+            return
+        for (job, (offset, _, lo, hi, progress)), segments in zip(batch, results):
+            if job.done: continue
+            fresh = commit_segments(segments, offset, lo, hi, job._previous)
+            if fresh: job._previous = fresh[-1]
+            self._emit(job, fresh, progress)
+            if progress >= 1.0: self._finish(job, "done")
+
+    def _run_pool_job(self, job, audio):
+        try:
+            with closing(self.pool.transcribe(audio, **job.options)) as stream:
+                for fresh, progress in stream:
+                    if job._cancelled.is_set():
+                        self._finish(job, "cancelled")
+                        return
+                    self._emit(job, fresh, progress)
+            self._finish(job, "done")
+        except Exception as e:
+            self._finish(job, "failed", e)
+        finally:
+            with self._cond:
+                self._pool_busy = False
+                self._cond.notify_all()
+
+    def _emit(self, job, segments, progress):
+        tm = job._timemap
+        if tm is not None: segments = [{"start": tm.to_original(s["start"]), "end": tm.to_original(s["end"], end=True), "text": s["text"]} for s in segments]
+        job.segments.extend(segments)
+        job.progress = progress
+
+    def _finish(self, job, status, error=None):
+        if job.done: return
+        # Nothing here may raise: a job that never reaches _done leaves every session polling it hanging
+        if status == "done" and self._cache is not None and job.cache_key:
+            try: job.segments = self._cache.put(job.cache_key, job.segments)
+            except Exception: logger.exception("could not cache transcript for job %s", job.id)
+        if status == "done" and self._on_done is not None:
+            try: self._on_done(job)
+            except Exception: logger.exception("on_done failed for job %s", job.id)
+        try: self._observe(job, status)
+        except Exception: logger.exception("could not record metrics for job %s", job.id)
+        with self._cond:
+            if job in self._active: self._active.remove(job)
+            if job in self._pending: self._pending.remove(job)
+            if self._inflight.get(job.cache_key) is job: del self._inflight[job.cache_key]
+            job.status, job.error = status, error
+            if status == "done": job.progress = 1.0
+            job._done.set()
+            self._cond.notify_all()
+
+    def _observe(self, job, status):
+        profiler, job._profiler = job._profiler, None
+        if profiler is not None: profiler.stop()
+        if job.started_at is None: return
+        elapsed = time.monotonic() - job.started_at
+        fields = {"job": job.id, "model": job.model, "segments": len(job.segments)}
+        if job.audio_seconds: fields["rtf"] = round(elapsed / job.audio_seconds, 4)
+        if profiler is not None and elapsed >= self.profile_slow and profiler.samples:
+            try: fields["profile"] = profiler.dump(os.path.join(self.profile_dir, f"{job.id}.folded"))
+            except OSError: logger.exception("could not write profile for job %s", job.id)
+        metrics.record("transcribe", elapsed, "ok" if status == "done" else status, audio_seconds=job.audio_seconds or 0.0, **fields)
@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger("podsnap.metrics")
+
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class Metrics:
+    """Per-stage duration histograms plus byte / audio-second counters, exported in the Prometheus text format.
+
+    Every recorded stage is also logged as one JSON line on the `podsnap.metrics` logger.
+    """
+
+    def __init__(self, buckets=BUCKETS, path=None):
+        self.buckets = tuple(buckets)
+        # Optional file rewritten after each record, e.g. for node_exporter's textfile collector
+        self.path = path
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._gauges = {}
+
+    def record(self, stage, seconds, status="ok", bytes=0, audio_seconds=0.0, **fields):
+        with self._lock:
+            s = self._stages.get((stage, status))
+            if s is None: s = self._stages[(stage, status)] = {"count": 0, "sum": 0.0, "buckets": [0] * len(self.buckets), "bytes": 0, "audio_seconds": 0.0}
+            s["count"] += 1
+            s["sum"] += seconds
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound: s["buckets"][i] += 1
+            s["bytes"] += bytes or 0
+            s["audio_seconds"] += audio_seconds or 0.0
+        event = {"event": "stage", "stage": stage, "status": status, "seconds": round(seconds, 4)}
+        if bytes: event["bytes"] = bytes
+        if audio_seconds: event["audio_seconds"] = round(audio_seconds, 2)
+        logger.info(json.dumps({**event, **fields}, ensure_ascii=False, default=str))
+        if self.path:
+            try: self.write(self.path)
+            except OSError: pass
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time the block; the yielded dict takes extra fields (bytes, audio_seconds, anything to log)."""
+        info, status = dict(fields), "ok"
+        start = time.perf_counter()
+        try: yield info
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, info.pop("status", status), **info)
+
+    def gauge(self, name, fn, help=""):
+        """Register a callback sampled at export time (queue depth, active jobs, ...)."""
+        with self._lock: self._gauges[name] = (fn, help)
+
+    def render(self):
+        lines = [
+            "# HELP podsnap_stage_duration_seconds Time spent per pipeline stage.",
+            "# TYPE podsnap_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = {key: {**s, "buckets": list(s["buckets"])} for key, s in self._stages.items()}
+            gauges = dict(self._gauges)
+        for (stage, status), s in sorted(stages.items()):
+            labels = f'stage="{stage}",status="{status}"'
+            for bound, count in zip(self.buckets, s["buckets"]): lines.append(f'podsnap_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'podsnap_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {s["count"]}')
+            lines.append(f"podsnap_stage_duration_seconds_sum{{{labels}}} {s['sum']:.6f}")
+            lines.append(f"podsnap_stage_duration_seconds_count{{{labels}}} {s['count']}")
+        for metric, key, help in (("podsnap_stage_bytes_total", "bytes", "Bytes handled per stage."), ("podsnap_stage_audio_seconds_total", "audio_seconds", "Seconds of audio handled per stage.")):
+            lines += [f"# HELP {metric} {help}", f"# TYPE {metric} counter"]
+            for (stage, status), s in sorted(stages.items()):
+                if s[key]: lines.append(f'{metric}{{stage="{stage}",status="{status}"}} {s[key]:g}')
+        for name, (fn, help) in sorted(gauges.items()):
+            try: value = float(fn())
+            except Exception: continue
+            lines += [f"# HELP {name} {help or name}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # record() runs on several threads: each writer needs its own temp file so none replaces a half-written one
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(self.render())
+        os.replace(tmp, path)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every `interval` seconds into folded stacks (flamegraph.pl / speedscope)."""
+
+    def __init__(self, thread_id=None, interval=0.01):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="podsnap-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread(): self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None: return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common(): f.write(f"{stack} {count}\n")
+        return path
+
+
+# Process-wide registry shared by the app and the inference service
+METRICS = Metrics()
+record, stage, gauge, render = METRICS.record, METRICS.stage, METRICS.gauge, METRICS.render
@@ -0,0 +1,76 @@
+import logging
+import threading
+
+from podsnap import metrics
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("tiny", "base", "small")
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every Linear layer, for CPU inference."""
+    import torch
+    for module in model.modules():
+        # Whisper's Linear subclass only adds fp16 casting; quantize_dynamic matches on the exact nn.Linear type
+        if isinstance(module, torch.nn.Linear): module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ModelRegistry:
+    """Loads each Whisper size at most once per process, optionally quantized, and picks tiers under load."""
+
+    def __init__(self, tiers=TIERS, quantize=False, device="cpu", fallback_depth=4):
+        self.tiers, self.quantize, self.device, self.fallback_depth = tuple(tiers), quantize, device, fallback_depth
+        self._models, self._locks, self._warming = {}, {}, set()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            if name in self._models: return self._models[name]
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._models:
+                with metrics.stage("model_load", model=name, quantized=self.quantize):
+                    import whisper
+                    model = whisper.load_model(name, device=self.device)
+                    if self.quantize and self.device == "cpu": model = quantize_int8(model)
+                with self._lock: self._models[name] = model
+        return self._models[name]
+
+    def is_loaded(self, name):
+        with self._lock: return name in self._models
+
+    def preload(self, names):
+        # Background warm-up so the first request after a deploy doesn't pay for download + load
+        def run():
+            for name in names:
+                try: self.get(name)
+                except Exception: logger.exception("could not preload model %s", name)
+                finally:
+                    with self._lock: self._warming.discard(name)
+        thread = threading.Thread(target=run, name="podsnap-model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def fallback(self, name, queue_depth):
+        """Step one tier down for every `fallback_depth` queued jobs, never below the smallest tier.
+
+        Only tiers that are already loaded qualify: a cold load on the scheduler thread would stall every
+        running job exactly when the queue is deep. If none is, the wanted tier starts loading in the background
+        so later submissions can use it.
+        """
+        if name not in self.tiers or not self.fallback_depth: return name
+        index = self.tiers.index(name)
+        steps = queue_depth // self.fallback_depth
+        if not steps: return name
+        for candidate in self.tiers[max(0, index - steps):index]:
+            if self.is_loaded(candidate): return candidate
+        self._warm(self.tiers[max(0, index - steps)])
+        return name
+
+    def _warm(self, name):
+        with self._lock:
+            if name in self._models or name in self._warming: return None
+            self._warming.add(name)
+        return self.preload([name])
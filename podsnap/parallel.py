@@ -0,0 +1,52 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from podsnap.audio import SAMPLE_RATE, find_split_points
+
+_model = None
+
+
+def _init_worker(model_name, torch_threads, quantize):
+    # Runs once per worker process: pin torch's intra-op threads and load the model a single time
+    global _model
+    import torch
+    import whisper
+    torch.set_num_threads(torch_threads)
+    _model = whisper.load_model(model_name)
+    if quantize:
+        from podsnap.models import quantize_int8
+        _model = quantize_int8(_model)
+
+
+def _transcribe_chunk(chunk, options):
+    result = _model.transcribe(chunk, condition_on_previous_text=False, **options)
+    return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+
+
+class TranscriptionPool:
+    """Process pool that splits long audio at quiet points and transcribes the chunks concurrently."""
+
+    def __init__(self, model_name, workers, torch_threads, quantize=False):
+        self.model_name, self.workers = model_name, workers
+        # spawn rather than fork: forking a process that already holds torch thread pools can deadlock
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker, initargs=(model_name, torch_threads, quantize))
+
+    def transcribe(self, audio, chunk_seconds=None, **options):
+        """Yield (segments, progress) chunk by chunk in timeline order, with absolute timestamps."""
+        if isinstance(audio, str):
+            import whisper
+            audio = whisper.load_audio(audio)
+        if chunk_seconds is None:
+            # A couple of chunks per worker keeps every core busy until the tail
+            chunk_seconds = min(600.0, max(60.0, len(audio) / SAMPLE_RATE / (self.workers * 2)))
+        points = find_split_points(audio, target=chunk_seconds)
+        futures = [self._executor.submit(_transcribe_chunk, audio[a:b], options) for a, b in zip(points, points[1:])]
+        try:
+            for future, a, b in zip(futures, points, points[1:]):
+                offset = a / SAMPLE_RATE
+                yield [{"start": s["start"] + offset, "end": s["end"] + offset, "text": s["text"]} for s in future.result()], b / len(audio)
+        finally:
+            for future in futures: future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
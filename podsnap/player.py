@@ -0,0 +1,300 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from podsnap.cache import segment_columns
+
+OWNER_COOKIE = "podsnap_owner"
+
+
+def transcript_payload(segments):
+    """(version, JSON bytes) of the sorted columnar transcript the player fetches; the version is a content hash."""
+    payload = json.dumps(segment_columns(sorted(segments, key=lambda s: s["start"])), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:12], payload
+
+
+class TranscriptPayloads:
+    """Thread-safe LRU of transcript payloads keyed by (audio path, version), for the audio server to hand out."""
+
+    def __init__(self, max_items=64):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, path, version, payload):
+        with self._lock:
+            self._items[(path, version)] = payload
+            self._items.move_to_end((path, version))
+            while len(self._items) > self.max_items: self._items.popitem(last=False)
+
+    def get(self, path, version):
+        # KeyError for an unknown or evicted version; the owning session republishes it on its next rerun
+        with self._lock: return self._items[(path, version)]
+
+
+def render_player(transcript_path, recommendations, audio_path, quotes_path, seek_to, port, base_url="", owner=None, fallback=None, episode=""):
+    """The full-screen player page. The transcript is fetched from the audio server, so the page size doesn't grow with the episode.
+
+    `fallback` ({"audio", "transcript"} URLs on the page's own origin) is used when the audio server's port is unreachable;
+    quotes are then kept in the browser's localStorage under `episode`.
+    """
+    # Inlined in a <script> block, so "</script>" inside catalog text must not close it
+    recs_json = json.dumps(recommendations, ensure_ascii=False).replace("<", "\\u003c")
+    seek_json = json.dumps(seek_to)
+    owner_json = json.dumps(owner)
+    fallback_json = json.dumps(fallback)
+    episode_json = json.dumps(episode)
+    return f"""
+    <html>
+    <head>
+        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
+        <script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script>
+        <style>
+            :root {{
+                --bg-color: #F7F3F0;
+                --card-bg: #EFE9E4;
+                --text-primary: #4A3F35;
+                --text-secondary: #7A6F66;
+                --accent-color: #8B5E3C;
+                --highlight-bg: rgba(139, 94, 60, 0.1);
+            }}
+            html, body {{ height: 100%; margin: 0; padding: 0; overflow: hidden; background: var(--bg-color); font-family: sans-serif; display: flex; color: var(--text-primary); }}
+            #main-container {{ flex: 1; display: flex; flex-direction: column; border-right: 1px solid #D1C4B9; position: relative; }}
+            #right-panel {{ width: 320px; display: flex; flex-direction: column; background: #F2EDE9; transition: width 0.3s; overflow: hidden; }}
+            #right-panel.collapsed {{ width: 0; }}
+            #header {{ flex: 0 0 auto; background: rgba(247, 243, 240, 0.95); padding: 15px 20px; border-bottom: 1px solid #D1C4B9; display: flex; flex-direction: column; gap: 10px; }}
+            .app-title {{ font-size: 18px; font-weight: 800; color: var(--accent-color); display: flex; justify-content: space-between; align-items: center; }}
+            audio {{ width: 100%; height: 35px; opacity: 0.8; }}
+            #transcript {{ flex: 1; overflow-y: auto; padding: 20px; scroll-behavior: smooth; }}
+            #transcript-spacer {{ position: relative; }}
+            .segment {{ position: absolute; left: 0; right: 0; height: 84px; box-sizing: border-box; padding: 12px; border-radius: 10px; cursor: pointer; color: var(--text-secondary); line-height: 1.5; font-size: 15px; border-left: 3px solid transparent; }}
+            .segment-time {{ font-size: 10px; color: #555; display: block; }}
+            .segment-text {{ display: -webkit-box; -webkit-line-clamp: 2; -webkit-box-orient: vertical; overflow: hidden; }}
+            .segment.active {{ background: linear-gradient(var(--highlight-bg), var(--highlight-bg)), var(--bg-color); border-left: 4px solid var(--accent-color); color: var(--text-primary); font-weight: 600; transform: scale(1.01); }}
+            /* Rows keep a fixed slot for the virtual list, but the playing (or tapped) one grows over its neighbours to show
+               its whole text: touch screens never show the title tooltip */
+            .segment.active {{ height: auto; min-height: 84px; z-index: 1; box-shadow: 0 4px 12px rgba(0,0,0,0.08); }}
+            .segment.active .segment-text {{ display: block; overflow: visible; }}
+            #footer {{ flex: 0 0 auto; padding: 15px; background: var(--bg-color); border-top: 1px solid #D1C4B9; display: flex; justify-content: center; }}
+            #mark-btn {{ background: var(--accent-color); color: white; border: none; width: 90%; height: 50px; border-radius: 25px; font-size: 18px; font-weight: bold; cursor: pointer; box-shadow: 0 4px 15px rgba(139, 94, 60, 0.2); }}
+            .panel-header {{ padding: 15px; font-size: 14px; font-weight: bold; color: #8E8279; border-bottom: 1px solid #D1C4B9; display: flex; justify-content: space-between; align-items: center; }}
+            #records-list {{ flex: 1; overflow-y: auto; padding: 15px; }}
+            .record-card {{ background: #EFE9E4; padding: 12px; border-radius: 8px; margin-bottom: 10px; cursor: pointer; border: 1px solid #D1C4B9; transition: 0.2s; }}
+            .record-card:hover {{ border-color: var(--accent-color); background: #F7F3F0; }}
+            .record-text {{ font-size: 13px; color: #4A3F35; line-height: 1.4; display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; overflow: hidden; }}
+            
+            /* Product Section - Enhanced UI */
+            #product-section {{ padding: 15px; background: #EFE9E4; border-top: 1px solid #D1C4B9; max-height: 280px; overflow-y: auto; }}
+            .product-card {{ background: #F7F3F0; padding: 10px; border-radius: 10px; display: flex; gap: 12px; align-items: center; text-decoration: none; margin-bottom: 10px; border: 1px solid #D1C4B9; transition: 0.2s; }}
+            .product-card:hover {{ border-color: var(--accent-color); }}
+            .product-img-container {{ width: 50px; height: 50px; border-radius: 8px; overflow: hidden; background: #D1C4B9; flex-shrink: 0; position: relative; }}
+            .product-img {{ width: 100%; height: 100%; object-fit: cover; }}
+            .product-info {{ flex: 1; min-width: 0; }}
+            .product-name {{ font-size: 12px; color: #4A3F35; font-weight: bold; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+            .product-price {{ font-size: 12px; color: var(--accent-color); margin-top: 2px; font-weight: bold; }}
+
+            /* Modals */
+            #poster-modal, #export-modal {{ display: none; position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0,0,0,0.95); z-index: 4000; align-items: center; justify-content: center; backdrop-filter: blur(15px); }}
+            #poster-wrapper, #export-wrapper {{ display: flex; flex-direction: column; align-items: center; gap: 20px; }}
+            #poster-content {{ width: 320px; height: 460px; border-radius: 20px; overflow: hidden; display: flex; flex-direction: column; padding: 40px; box-sizing: border-box; position: relative; }}
+            .poster-modern {{ background: #000; color: #FFF; justify-content: center; }}
+            .poster-cyber {{ background: #0a0a0a; color: #0ff; justify-content: center; border: 2px solid #0ff; }}
+            .poster-zen {{ background: linear-gradient(180deg, #eef2f3 0%, #8e9eab 100%); color: #2c3e50; justify-content: center; }}
+            .poster-vintage {{ background: #fdfcf0; color: #4a3728; justify-content: center; border: 10px solid #e8e4c9; }}
+            #poster-text {{ font-size: 22px; font-weight: bold; line-height: 1.6; z-index: 2; }}
+
+            /* Book Style Export */
+            #export-content {{ width: 360px; max-height: 80vh; background: #FFF; color: #333; padding: 40px; border-radius: 4px; box-shadow: 0 10px 30px rgba(0,0,0,0.5); overflow-y: auto; font-family: serif; position: relative; }}
+            .book-title {{ font-size: 24px; font-weight: bold; border-bottom: 2px solid #333; padding-bottom: 10px; margin-bottom: 30px; text-align: center; }}
+            .book-quote {{ margin-bottom: 25px; position: relative; padding-left: 20px; border-left: 2px solid #EEE; }}
+            .book-quote-text {{ font-size: 15px; line-height: 1.6; font-style: italic; }}
+            .book-footer {{ margin-top: 40px; text-align: center; font-size: 12px; color: #AAA; border-top: 1px solid #EEE; padding-top: 20px; }}
+
+            #toast {{ position: fixed; top: 80px; left: 50%; transform: translateX(-50%); background: #4CAF50; color: white; padding: 10px 20px; border-radius: 20px; font-size: 14px; display: none; z-index: 3000; }}
+            .style-selector {{ display: flex; gap: 15px; background: rgba(255,255,255,0.1); padding: 12px 25px; border-radius: 40px; }}
+            .style-dot {{ width: 30px; height: 30px; border-radius: 50%; border: 3px solid transparent; cursor: pointer; transition: 0.3s; }}
+            .style-dot.active {{ border-color: var(--accent-color); transform: scale(1.2); }}
+        </style>
+    </head>
+    <body>
+        <div id="toast">✅ 记录成功，已存入灵感库</div>
+        <div id="main-container">
+            <div id="header">
+                <div class="app-title"><span>PodSnap ⚡️</span><i class="fas fa-bars" style="cursor:pointer; color: #666;" onclick="togglePanel()"></i></div>
+                <audio id="audio-player" controls preload="metadata"></audio>
+            </div>
+            <div id="transcript"><div id="transcript-spacer"></div></div>
+            <div id="footer"><button id="mark-btn" onclick="captureMoment()"><i class="fas fa-bookmark"></i> 记一下</button></div>
+        </div>
+        <div id="right-panel">
+            <div class="panel-header"><span>灵感库 <i class="fas fa-lightbulb" style="color: #FFD700;"></i></span><button onclick="openExport()" style="background:none; border:1px solid #444; color:#888; font-size:10px; padding:2px 8px; border-radius:10px; cursor:pointer;">导出全部</button></div>
+            <div id="records-list"><div style="color: #444; text-align: center; margin-top: 50px; font-size: 12px;">暂无记录</div></div>
+            <div id="product-section">
+                <div style="font-size: 10px; color: #666; margin-bottom: 10px;">基于内容推荐</div>
+                <div id="recs-container"></div>
+            </div>
+        </div>
+
+        <div id="poster-modal"><div id="poster-wrapper">
+            <div class="style-selector">
+                <div class="style-dot active" style="background: #000;" onclick="setStyle('modern', this)"></div>
+                <div class="style-dot" style="background: #0ff;" onclick="setStyle('cyber', this)"></div>
+                <div class="style-dot" style="background: #8e9eab;" onclick="setStyle('zen', this)"></div>
+                <div class="style-dot" style="background: #fdfcf0;" onclick="setStyle('vintage', this)"></div>
+            </div>
+            <div id="poster-content" class="poster-modern"><div id="poster-text"></div><div style="margin-top: 30px; font-size: 12px; opacity: 0.6;">—— 来自 PodSnap ⚡️</div></div>
+            <div style="display:flex; gap:15px;">
+                <button style="background: rgba(255,255,255,0.1); color: white; border: 1px solid #444; padding: 10px 25px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="closeModal()">返回</button>
+                <button style="background: var(--accent-color); color: white; border: none; padding: 10px 35px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="downloadImage('poster-content', 'PodSnap_Poster')">保存海报</button>
+            </div>
+        </div></div>
+
+        <div id="export-modal"><div id="export-wrapper">
+            <div id="export-content"><div class="book-title">PodSnap 读书笔记</div><div id="book-quotes-container"></div><div class="book-footer"><div style="font-weight:bold; color:#333;">PodSnap ⚡️</div><div style="font-size:10px;">记录每一个触动瞬间</div></div></div>
+            <div style="display:flex; gap:15px;">
+                <button style="background: rgba(255,255,255,0.1); color: white; border: 1px solid #444; padding: 10px 25px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="document.getElementById('export-modal').style.display='none'">返回</button>
+                <button style="background: var(--accent-color); color: white; border: none; padding: 10px 35px; border-radius: 20px; font-weight: bold; cursor: pointer;" onclick="downloadImage('export-content', 'PodSnap_Notes')">分享笔记长图</button>
+            </div>
+        </div></div>
+
+        <script>
+            try {{
+                const parentDoc = window.parent.document;
+                const iframe = parentDoc.querySelector('iframe[title="streamlit.components.v1.components.html"]');
+                if (iframe) {{ iframe.style.position = 'fixed'; iframe.style.top = '0'; iframe.style.left = '0'; iframe.style.width = '100vw'; iframe.style.height = '100vh'; iframe.style.zIndex = '999999'; iframe.style.border = 'none'; }}
+            }} catch (e) {{}}
+            const recsData = {recs_json};
+            // Transcript, quote and catalog text is untrusted: it only ever reaches the DOM through textContent
+            function el(tag, className, text) {{ const e = document.createElement(tag); e.className = className; if (text !== undefined) e.textContent = text; return e; }}
+            const owner = {owner_json};
+            if (owner) {{ try {{ document.cookie = "{OWNER_COOKIE}=" + owner + "; path=/; max-age=31536000; SameSite=Lax"; }} catch (e) {{}} }}
+            const container = document.getElementById('transcript');
+            const player = document.getElementById('audio-player');
+            // Audio streams from the local Range-capable server instead of being inlined in this page
+            let audioBase = "{base_url}";
+            if (!audioBase) {{
+                try {{ audioBase = window.parent.location.protocol + '//' + window.parent.location.hostname + ':{port}'; }}
+                catch (e) {{ audioBase = 'http://localhost:{port}'; }}
+            }}
+            audioBase = audioBase.replace(/[/]$/, '');
+            // If that port is not reachable from this browser (firewall, HTTPS page, not published), audio and transcript
+            // come from Streamlit's own static route instead and quotes stay in this browser
+            const fallback = {fallback_json};
+            const localQuotesKey = 'podsnap_quotes:' + {episode_json};
+            let quotesUrl = null;
+            function getJson(url, timeout) {{
+                const ctl = new AbortController(); const timer = setTimeout(() => ctl.abort(), timeout);
+                return fetch(url, {{ signal: ctl.signal }}).finally(() => clearTimeout(timer)).then(r => {{ if (!r.ok) throw new Error(r.status); return r.json(); }});
+            }}
+            let transcriptSource = getJson(audioBase + "{transcript_path}", 3000).then(data => {{ player.src = audioBase + "{audio_path}"; quotesUrl = audioBase + "{quotes_path}"; return data; }});
+            if (fallback) transcriptSource = transcriptSource.catch(() => getJson(fallback.transcript, 15000).then(data => {{ player.src = fallback.audio; return data; }}));
+            const seekTo = {seek_json};
+            if (seekTo !== null) player.addEventListener('loadedmetadata', () => {{ player.currentTime = seekTo; }}, {{ once: true }});
+            const recordsList = document.getElementById('records-list');
+            const recsContainer = document.getElementById('recs-container');
+            let currentSegment = null; let records = [];
+            // Saved quotes persist in the server-side search index (or localStorage on the fallback); merge them in once loaded
+            function localQuotes() {{ try {{ return JSON.parse(localStorage.getItem(localQuotesKey) || '[]'); }} catch (e) {{ return []; }} }}
+            function mergeQuotes(saved) {{ if (saved.length) {{ records = records.concat(saved); updateRecordsUI(); }} }}
+            function loadQuotes() {{
+                if (quotesUrl) fetch(quotesUrl).then(r => r.json()).then(mergeQuotes).catch(() => {{}});
+                else mergeQuotes(localQuotes());
+            }}
+            function saveQuote(quote) {{
+                if (quotesUrl) {{ fetch(quotesUrl, {{ method: 'POST', body: JSON.stringify(quote) }}).catch(() => {{}}); return; }}
+                try {{ localStorage.setItem(localQuotesKey, JSON.stringify([quote].concat(localQuotes()))); }} catch (e) {{}}
+            }}
+            
+            // Render Recommendations with Smart Images
+            recsData.forEach(item => {{
+                const a = document.createElement('a'); a.className = 'product-card'; a.href = "https://s.taobao.com/search?q=" + encodeURIComponent(item.name); a.target = "_blank";
+                a.innerHTML = `
+                    <div class="product-img-container">
+                        <img class="product-img" onerror="this.style.display='none'">
+                        <div class="product-initial" style="position:absolute; top:0; left:0; width:100%; height:100%; display:flex; align-items:center; justify-content:center; color:white; font-weight:bold; font-size:20px; z-index:-1"></div>
+                    </div>
+                    <div class="product-info">
+                        <div class="product-name"></div>
+                        <div class="product-price"></div>
+                    </div>
+                    <i class="fas fa-chevron-right" style="color: #444; font-size: 10px;"></i>
+                `;
+                a.querySelector('.product-img-container').style.background = item.color;
+                a.querySelector('.product-img').src = item.img;
+                a.querySelector('.product-initial').textContent = String(item.name).replace(/《|》/g, '').charAt(0);
+                a.querySelector('.product-name').textContent = item.name;
+                a.querySelector('.product-price').textContent = '¥ ' + item.price;
+                recsContainer.appendChild(a);
+            }});
+
+            // Virtualized transcript: fixed-height rows, only the visible window (plus overscan) is in the DOM
+            const ROW_HEIGHT = 92; const OVERSCAN = 8;
+            // Columns arrive pre-sorted and gzipped from the audio server: {{start: [...], end: [...], text: [...]}}
+            let transcriptData = []; let starts = new Float64Array(0); let ends = new Float64Array(0);
+            const spacer = document.getElementById('transcript-spacer');
+            const rows = new Map(); let renderedFirst = -1; let renderedLast = -1; let activeIdx = -1; let renderQueued = false;
+            function formatTime(t) {{ return new Date(t * 1000).toISOString().substr(t >= 3600 ? 11 : 14, t >= 3600 ? 8 : 5); }}
+            function findSegment(time) {{
+                let lo = 0, hi = starts.length - 1, idx = -1;
+                while (lo <= hi) {{ const mid = (lo + hi) >> 1; if (starts[mid] <= time) {{ idx = mid; lo = mid + 1; }} else hi = mid - 1; }}
+                return (idx !== -1 && time < ends[idx]) ? idx : -1;
+            }}
+            function makeRow(index) {{
+                const seg = transcriptData[index];
+                const div = document.createElement('div'); div.className = index === activeIdx ? 'segment active' : 'segment'; div.style.top = (index * ROW_HEIGHT) + 'px'; div.title = seg.text;
+                div.onclick = () => {{ setActive(index, false); player.currentTime = seg.start; player.play(); }};
+                div.append(el('span', 'segment-time', formatTime(seg.start)), el('div', 'segment-text', seg.text));
+                return div;
+            }}
+            function renderRows() {{
+                renderQueued = false;
+                const first = Math.max(0, Math.floor(container.scrollTop / ROW_HEIGHT) - OVERSCAN);
+                const last = Math.min(transcriptData.length - 1, Math.ceil((container.scrollTop + container.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+                if (first === renderedFirst && last === renderedLast) return;
+                rows.forEach((el, i) => {{ if (i < first || i > last) {{ el.remove(); rows.delete(i); }} }});
+                for (let i = first; i <= last; i++) if (!rows.has(i)) {{ const el = makeRow(i); rows.set(i, el); spacer.appendChild(el); }}
+                renderedFirst = first; renderedLast = last;
+            }}
+            function queueRender() {{ if (!renderQueued) {{ renderQueued = true; requestAnimationFrame(renderRows); }} }}
+            container.addEventListener('scroll', queueRender, {{ passive: true }});
+            window.addEventListener('resize', queueRender);
+            transcriptSource.then(data => {{
+                loadQuotes();
+                transcriptData = data.text.map((text, i) => ({{ start: data.start[i], end: data.end[i], text }}));
+                starts = Float64Array.from(data.start); ends = Float64Array.from(data.end);
+                spacer.style.height = (transcriptData.length * ROW_HEIGHT) + 'px';
+                renderRows();
+            }}).catch(() => {{ spacer.innerHTML = '<div style="color: #7A6F66; text-align: center; margin-top: 50px;">转写内容加载失败，请刷新页面</div>'; }});
+            player.ontimeupdate = () => {{
+                // Binary search on the start-time index; the DOM is only touched when the active segment changes
+                const idx = findSegment(player.currentTime);
+                if (idx !== -1 && idx !== activeIdx) setActive(idx, true);
+            }};
+            function setActive(idx, scroll) {{
+                const prev = rows.get(activeIdx); if (prev) prev.classList.remove('active');
+                activeIdx = idx; currentSegment = transcriptData[idx];
+                const el = rows.get(idx); if (el) el.classList.add('active');
+                if (scroll) container.scrollTo({{ top: idx * ROW_HEIGHT - (container.clientHeight - ROW_HEIGHT) / 2, behavior: 'smooth' }});
+            }}
+            function captureMoment() {{
+                if (!currentSegment) return; records.unshift({{ ...currentSegment, timestamp: new Date().toLocaleTimeString() }}); updateRecordsUI(); showToast();
+                saveQuote({{ start: currentSegment.start, end: currentSegment.end, text: currentSegment.text }});
+            }}
+            function updateRecordsUI() {{ recordsList.innerHTML = ''; records.forEach((rec, i) => {{ const div = document.createElement('div'); div.className = 'record-card'; div.onclick = () => openPoster(rec.text); div.appendChild(el('div', 'record-text', '"' + rec.text + '"')); recordsList.appendChild(div); }}); }}
+            function showToast() {{ const t = document.getElementById('toast'); t.style.display = 'block'; setTimeout(() => t.style.display = 'none', 2000); }}
+            function togglePanel() {{ document.getElementById('right-panel').classList.toggle('collapsed'); }}
+            function openPoster(text) {{ document.getElementById('poster-text').innerText = text; document.getElementById('poster-modal').style.display = 'flex'; setStyle('modern', document.querySelector('.style-dot')); }}
+            function setStyle(style, el) {{ document.getElementById('poster-content').className = 'poster-' + style; document.querySelectorAll('.style-dot').forEach(d => d.classList.remove('active')); el.classList.add('active'); }}
+            function closeModal() {{ document.getElementById('poster-modal').style.display = 'none'; }}
+            function openExport() {{
+                if (records.length === 0) {{ alert("灵感库还是空的哦"); return; }}
+                const container = document.getElementById('book-quotes-container'); container.innerHTML = '';
+                records.forEach(rec => {{ const div = el('div', 'book-quote'); div.appendChild(el('div', 'book-quote-text', '“' + rec.text + '”')); container.appendChild(div); }});
+                document.getElementById('export-modal').style.display = 'flex';
+            }}
+            async function downloadImage(elementId, filename) {{ const element = document.getElementById(elementId); const canvas = await html2canvas(element, {{ scale: 2 }}); const link = document.createElement('a'); link.download = filename + '.png'; link.href = canvas.toDataURL('image/png'); link.click(); }}
+        </script>
+    </body>
+    </html>
+    """
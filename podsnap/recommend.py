@@ -0,0 +1,82 @@
+import json
+from collections import deque
+
+FALLBACKS = [
+    {"name": "PodSnap Pro 会员", "price": "19.9/月", "tag": "premium", "color": "#8B5E3C"},
+    {"name": "车载手机支架", "price": "35.00", "tag": "car", "color": "#555555"},
+]
+
+
+def load_catalog(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"): return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every occurrence of every keyword in a single pass over the text."""
+
+    def __init__(self, keywords):
+        # keywords: iterable of (keyword, payload); matching is case-sensitive, like a plain `keyword in text`
+        # (lowercasing would let "AI" match inside "said" or "again")
+        self._goto, self._fail, self._out = [{}], [0], [[]]
+        for keyword, payload in keywords:
+            if not keyword: continue
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({}); self._fail.append(0); self._out.append([])
+                state = nxt
+            self._out[state].append((len(keyword), payload))
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]: f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text):
+        """Yield (start_index, payload) for each keyword occurrence."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]: state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]: yield i - length + 1, payload
+
+
+class Recommender:
+    """Catalog loaded once with a keyword automaton over every SKU."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._automaton = KeywordAutomaton((kw, idx) for idx, item in enumerate(catalog) for kw in item.get("keywords", []))
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_catalog(path))
+
+    def rank(self, text):
+        # Score = keyword hits, each weighted up to 1.5x the earlier it appears; ties go to the earliest mention
+        scores, first_seen = {}, {}
+        length = max(1, len(text))
+        for pos, idx in self._automaton.iter_matches(text):
+            scores[idx] = scores.get(idx, 0.0) + 1.0 + 0.5 * (1 - pos / length)
+            first_seen.setdefault(idx, pos)
+        return sorted(scores, key=lambda idx: (-scores[idx], first_seen[idx]))
+
+    def recommend(self, text, limit=3):
+        results = [dict(self.catalog[idx]) for idx in self.rank(text)[:limit]]
+        if len(results) < 2: results.append(dict(FALLBACKS[0]))
+        if len(results) < 3: results.append(dict(FALLBACKS[1]))
+        for item in results:
+            item.pop("keywords", None)
+            item.setdefault("img", f"https://images.weserv.nl/?url=loremflickr.com/200/200/{item['tag']},product/all")
+        return results[:limit]
@@ -0,0 +1,138 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_RUNS = re.compile(f"[{_CJK}]+|[0-9A-Za-z\u00c0-\u024f]+")
+_IS_CJK = re.compile(f"[{_CJK}]")
+
+# Bump when ngrams() changes; older databases are re-tokenized on open
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (id TEXT PRIMARY KEY, title TEXT, audio_path TEXT, added_at REAL);
+CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY, episode TEXT NOT NULL, start REAL, end REAL, text TEXT);
+CREATE INDEX IF NOT EXISTS segments_episode ON segments (episode, start);
+CREATE TABLE IF NOT EXISTS episode_owners (owner TEXT NOT NULL, episode TEXT NOT NULL, title TEXT, added_at REAL, PRIMARY KEY (owner, episode));
+CREATE INDEX IF NOT EXISTS episode_owners_episode ON episode_owners (episode);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5 (grams, prefix='1');
+CREATE TABLE IF NOT EXISTS quotes (id INTEGER PRIMARY KEY, episode TEXT NOT NULL, start REAL, end REAL, text TEXT, created_at REAL, owner TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5 (grams, prefix='1');
+"""
+
+
+def _tokens(run):
+    if _IS_CJK.match(run):
+        # Chinese has no word boundaries: index overlapping character bigrams
+        return [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+    return [run.lower()]
+
+
+def ngrams(text):
+    """Indexed form of `text`. CJK runs also end with their last character as a unigram, so a one-character
+    prefix query ("x"*) reaches every position, not only characters that start a bigram."""
+    tokens = []
+    for run in _RUNS.findall(text):
+        tokens += _tokens(run)
+        if len(run) > 1 and _IS_CJK.match(run): tokens.append(run[-1])
+    return " ".join(tokens)
+
+
+def match_query(text):
+    """FTS5 MATCH expression: each run of the query must appear as a contiguous phrase."""
+    phrases = []
+    for run in _RUNS.findall(text):
+        tokens = _tokens(run)
+        if len(run) == 1 and _IS_CJK.match(run):
+            phrases.append(f'"{tokens[0]}"*')  # a lone character only exists as a bigram prefix
+        else:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " ".join(phrases)
+
+
+class SearchIndex:
+    """SQLite store of transcripts and saved quotes with a bigram FTS5 index across every episode.
+
+    Transcripts are stored once per audio content, but each owner only finds (and sees under their own title)
+    the episodes they imported themselves.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            # Quotes are private to whoever saved them; older databases predate the owner column
+            if "owner" not in [row[1] for row in self._db.execute("PRAGMA table_info(quotes)")]: self._db.execute("ALTER TABLE quotes ADD COLUMN owner TEXT")
+            self._db.execute("DROP INDEX IF EXISTS quotes_episode")
+            self._db.execute("CREATE INDEX IF NOT EXISTS quotes_owner ON quotes (owner, episode, created_at)")
+            if self._db.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION: self._reindex()
+
+    def _reindex(self):
+        # The tokenization changed: rebuild both full-text tables from the stored text
+        db = self._db
+        for table in ("segments", "quotes"):
+            db.execute(f"DELETE FROM {table}_fts")
+            db.executemany(f"INSERT INTO {table}_fts (rowid, grams) VALUES (?, ?)", [(rowid, ngrams(text)) for rowid, text in db.execute(f"SELECT id, text FROM {table}").fetchall()])
+        db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    def has_episode(self, episode):
+        with self._lock: return self._db.execute("SELECT 1 FROM episodes WHERE id = ?", (episode,)).fetchone() is not None
+
+    def add_episode(self, episode, title, audio_path, segments):
+        """Replace an episode's segments in one transaction."""
+        rows = [(episode, s["start"], s["end"], s["text"]) for s in segments]
+        with self._lock, self._db:
+            db = self._db
+            db.execute("INSERT OR REPLACE INTO episodes (id, title, audio_path, added_at) VALUES (?, ?, ?, ?)", (episode, title, audio_path, time.time()))
+            db.execute("DELETE FROM segments_fts WHERE rowid IN (SELECT id FROM segments WHERE episode = ?)", (episode,))
+            db.execute("DELETE FROM segments WHERE episode = ?", (episode,))
+            first = (db.execute("SELECT COALESCE(MAX(id), 0) FROM segments").fetchone()[0]) + 1
+            db.executemany("INSERT INTO segments (id, episode, start, end, text) VALUES (?, ?, ?, ?, ?)", [(first + i,) + row for i, row in enumerate(rows)])
+            db.executemany("INSERT INTO segments_fts (rowid, grams) VALUES (?, ?)", [(first + i, ngrams(row[3])) for i, row in enumerate(rows)])
+
+    def add_owner(self, owner, episode, title):
+        """Record that `owner` imported `episode` (under `title`), which makes its transcript searchable for them."""
+        with self._lock, self._db: self._db.execute("INSERT OR REPLACE INTO episode_owners (owner, episode, title, added_at) VALUES (?, ?, ?, ?)", (owner, episode, title, time.time()))
+
+    def episode(self, episode, owner):
+        """The episode as `owner` imported it, or None if they never did."""
+        sql = "SELECT e.id, o.title, e.audio_path FROM episodes e JOIN episode_owners o ON o.episode = e.id WHERE e.id = ? AND o.owner = ?"
+        with self._lock: row = self._db.execute(sql, (episode, owner)).fetchone()
+        return dict(zip(("id", "title", "audio_path"), row)) if row else None
+
+    def segments(self, episode):
+        with self._lock: rows = self._db.execute("SELECT start, end, text FROM segments WHERE episode = ? ORDER BY start", (episode,)).fetchall()
+        return [{"id": i, "start": s, "end": e, "text": t} for i, (s, e, t) in enumerate(rows)]
+
+    def add_quote(self, owner, episode, start, end, text):
+        with self._lock, self._db:
+            cur = self._db.execute("INSERT INTO quotes (owner, episode, start, end, text, created_at) VALUES (?, ?, ?, ?, ?, ?)", (owner, episode, start, end, text, time.time()))
+            self._db.execute("INSERT INTO quotes_fts (rowid, grams) VALUES (?, ?)", (cur.lastrowid, ngrams(text)))
+
+    def quotes(self, owner, episode):
+        with self._lock: rows = self._db.execute("SELECT start, end, text, created_at FROM quotes WHERE owner = ? AND episode = ? ORDER BY created_at DESC", (owner, episode)).fetchall()
+        return [{"start": s, "end": e, "text": t, "timestamp": time.strftime("%H:%M:%S", time.localtime(c))} for s, e, t, c in rows]
+
+    def search(self, text, limit=20, owner=None):
+        """Timestamped hits from the transcripts `owner` imported and from their quotes, best matches first."""
+        query = match_query(text)
+        if not query: return []
+        sql = """
+            SELECT kind, episode, title, start, end, text FROM (
+                SELECT 'segment' AS kind, s.episode, o.title, s.start, s.end, s.text, f.rank AS rank
+                FROM segments_fts f JOIN segments s ON s.id = f.rowid JOIN episode_owners o ON o.episode = s.episode
+                WHERE segments_fts MATCH ?1 AND o.owner = ?3
+                UNION ALL
+                SELECT 'quote', q.episode, o.title, q.start, q.end, q.text, f.rank - 1
+                FROM quotes_fts f JOIN quotes q ON q.id = f.rowid LEFT JOIN episode_owners o ON o.episode = q.episode AND o.owner = q.owner
+                WHERE quotes_fts MATCH ?1 AND q.owner = ?3
+            ) ORDER BY rank LIMIT ?2
+        """
+        with self._lock: rows = self._db.execute(sql, (query, limit, owner)).fetchall()
+        return [dict(zip(("kind", "episode", "title", "start", "end", "text"), row)) for row in rows]
@@ -0,0 +1,43 @@
+import os
+import shutil
+
+from podsnap.cache import DiskCache
+
+# Streamlit answers 404 for larger static files
+MAX_FILE_BYTES = 200 << 20
+
+
+class StaticMirror(DiskCache):
+    """Copies of player files in Streamlit's static folder, for browsers that cannot reach the audio server's port.
+
+    Files are named after the audio server's random tokens, so their URLs are as hard to guess as /audio/ ones.
+    """
+
+    def __init__(self, root, max_bytes, url_prefix):
+        super().__init__(root, max_bytes)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def url_for(self, path):
+        return self.url_prefix + "/" + os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def add_file(self, key, source):
+        """Mirror `source` (a hard link where possible) and return its URL, or None if Streamlit would not serve it."""
+        path = self.path_for(key, os.path.splitext(source)[1])
+        if os.path.exists(path):
+            self.touch(path)
+            return self.url_for(path)
+        if os.path.getsize(source) > MAX_FILE_BYTES: return None
+        tmp = self.temp_path(path)
+        # Streamlit refuses symlinks that leave its static folder, so link the inode itself (or copy across devices)
+        try: os.link(source, tmp)
+        except OSError: shutil.copyfile(source, tmp)
+        return self.url_for(self.commit(tmp, path))
+
+    def add_bytes(self, key, suffix, data):
+        path = self.path_for(key, suffix)
+        if os.path.exists(path): self.touch(path)
+        else:
+            tmp = self.temp_path(path)
+            with open(tmp, "wb") as f: f.write(data)
+            self.commit(tmp, path)
+        return self.url_for(path)
@@ -0,0 +1,76 @@
+import numpy as np
+
+from podsnap.audio import SAMPLE_RATE
+
+
+def iter_windows(audio, window=30.0, overlap=2.0, sr=SAMPLE_RATE):
+    # Fixed windows overlapping by `overlap` seconds. Each window owns the segments whose midpoint
+    # falls in [lo, hi); the boundary sits in the middle of the overlap so neighbours never both keep one.
+    # `audio` is only sliced, so a memmap or a SpeechAudio view yields each window without loading the rest.
+    total = len(audio) / sr
+    step = window - overlap
+    start, lo = 0.0, 0.0
+    while True:
+        end = min(start + window, total)
+        last = end >= total
+        hi = float("inf") if last else start + step + overlap / 2
+        yield start, audio[int(start * sr):int(end * sr)], lo, hi, (end / total if total else 1.0)
+        if last: break
+        lo, start = hi, start + step
+
+
+def commit_segments(segments, offset, lo, hi, previous=None):
+    fresh = []
+    for seg in segments:
+        start, end, text = seg["start"] + offset, seg["end"] + offset, seg["text"]
+        if not lo <= (start + end) / 2 < hi: continue
+        if previous is not None:
+            # Whisper sometimes repeats the boundary sentence in both windows with shifted times
+            if text.strip() == previous["text"].strip() and start < previous["end"] + 1.0: continue
+            start = max(start, previous["end"])
+        previous = {"start": start, "end": max(end, start), "text": text}
+        fresh.append(previous)
+    return fresh
+
+
+def _split_timestamped(tokens, tokenizer, duration):
+    # Turn "<|0.00|> text <|2.40|><|2.40|> text <|5.00|>" into segments relative to the window
+    segments, text_tokens, start = [], [], None
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            t = (token - tokenizer.timestamp_begin) * 0.02
+            if start is None: start = t
+            else:
+                if text_tokens: segments.append({"start": start, "end": t, "text": tokenizer.decode(text_tokens)})
+                text_tokens, start = [], None
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+    if text_tokens: segments.append({"start": start or 0.0, "end": duration, "text": tokenizer.decode(text_tokens)})
+    return segments
+
+
+def decode_windows(model, chunks, language=None, initial_prompt=None):
+    """Decode several <=30 s windows in one batched forward pass; returns window-relative segments per chunk.
+
+    Windows whose batched greedy decode looks degenerate fall back to model.transcribe, which retries with
+    temperature the way Whisper does for a single file.
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+    # Copy out of the read-only PCM memmap; torch wants writable buffers
+    chunks = [np.array(chunk, dtype=np.float32) for chunk in chunks]
+    mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(chunk), model.dims.n_mels) for chunk in chunks]).to(model.device)
+    options = whisper.DecodingOptions(task="transcribe", language=language, prompt=initial_prompt, fp16=model.device.type != "cpu")
+    results = whisper.decode(model, mels, options)
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages, language=language, task="transcribe")
+    segments = []
+    for chunk, result in zip(chunks, results):
+        if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+            segments.append([])
+        elif result.compression_ratio > 2.4 or result.avg_logprob < -1.0:
+            fallback = model.transcribe(chunk, language=language, initial_prompt=initial_prompt, condition_on_previous_text=False)
+            segments.append([{"start": s["start"], "end": s["end"], "text": s["text"]} for s in fallback["segments"]])
+        else:
+            segments.append(_split_timestamped(result.tokens, tokenizer, len(chunk) / SAMPLE_RATE))
+    return segments
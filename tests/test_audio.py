@@ -0,0 +1,95 @@
+import numpy as np
+
+from podsnap.audio import SAMPLE_RATE, SpeechAudio, TimeMap, extract_speech, find_split_points, frame_energy, speech_regions
+from podsnap.transcribe import iter_windows
+
+
+def speech_with_pauses(layout, seed=0):
+    """Noise for every ("speech", seconds) entry, digital silence for every ("pause", seconds) one."""
+    rng = np.random.default_rng(seed)
+    parts = [rng.normal(0, 0.1, int(s * SAMPLE_RATE)) if kind == "speech" else np.zeros(int(s * SAMPLE_RATE)) for kind, s in layout]
+    return np.concatenate(parts).astype(np.float32)
+
+
+def test_long_pauses_split_speech_regions():
+    audio = speech_with_pauses([("speech", 5), ("pause", 3), ("speech", 5)])
+    (a0, a1), (b0, b1) = speech_regions(audio)
+    # Padded by 0.2 s on both sides of each run of speech
+    assert a0 == 0 and abs(a1 / SAMPLE_RATE - 5.2) < 0.05
+    assert abs(b0 / SAMPLE_RATE - 7.8) < 0.05 and b1 == len(audio)
+
+
+def test_short_pauses_stay_inside_one_region():
+    audio = speech_with_pauses([("speech", 5), ("pause", 0.5), ("speech", 5)])
+    assert speech_regions(audio) == [(0, len(audio))]
+
+
+def test_tiny_and_empty_inputs():
+    assert speech_regions(np.zeros(10, dtype=np.float32)) == [(0, 10)]
+    assert speech_regions(np.zeros(0, dtype=np.float32)) == []
+
+
+def test_timemap_maps_across_cuts():
+    sr = SAMPLE_RATE
+    tm = TimeMap([(0, 5 * sr), (10 * sr, 20 * sr)])
+    assert tm.to_original(2.0) == 2.0
+    assert tm.to_original(6.0) == 11.0
+    # A boundary starts the next region, unless it is the end of a segment
+    assert tm.to_original(5.0) == 10.0
+    assert tm.to_original(5.0, end=True) == 5.0
+
+
+def test_timemap_without_leading_region():
+    tm = TimeMap([(3 * SAMPLE_RATE, 4 * SAMPLE_RATE)])
+    assert tm.to_original(0.0) == 3.0 and tm.to_original(0.5) == 3.5
+
+
+def test_extract_speech_drops_silence():
+    audio = speech_with_pauses([("speech", 5), ("pause", 10), ("speech", 5)])
+    speech, tm = extract_speech(audio)
+    assert abs(len(speech) / SAMPLE_RATE - 10.4) < 0.1
+    assert abs(tm.to_original(7.0) - 16.6) < 0.1
+
+
+def test_speech_audio_reads_only_the_slice_asked_for():
+    audio = np.arange(100, dtype=np.float32)
+    regions = [(10, 20), (50, 55), (90, 100)]
+    speech = SpeechAudio(audio, regions)
+    joined = np.concatenate([audio[a:b] for a, b in regions])
+    assert len(speech) == len(joined) == 25
+    for lo, hi in ((0, 25), (3, 12), (10, 15), (12, 24), (24, 40), (30, 40), (5, 5)):
+        assert np.array_equal(speech[lo:hi], joined[lo:hi])
+    assert [len(chunk) for _, chunk, *_ in iter_windows(speech, window=1.0, overlap=0.0, sr=10)] == [10, 10, 5]
+
+
+def test_extract_speech_leaves_a_memmap_on_disk(tmp_path):
+    path = tmp_path / "pcm.f32"
+    speech_with_pauses([("speech", 5), ("pause", 10), ("speech", 5)]).tofile(path)
+    audio = np.memmap(path, dtype=np.float32, mode="r")
+    speech, _ = extract_speech(audio)
+    assert isinstance(speech, SpeechAudio) and speech.audio is audio
+    assert np.array_equal(speech[:SAMPLE_RATE], audio[:SAMPLE_RATE])
+
+
+def test_frame_energy_is_the_same_in_blocks():
+    audio = speech_with_pauses([("speech", 3), ("pause", 1), ("speech", 3)])
+    assert np.allclose(frame_energy(audio, block=7), frame_energy(audio, block=1 << 20))
+
+
+def test_extract_speech_keeps_audio_when_little_is_saved():
+    audio = speech_with_pauses([("speech", 20), ("pause", 0.6), ("speech", 20)])
+    speech, tm = extract_speech(audio)
+    assert speech is audio and tm is None
+
+
+def test_split_points_land_in_pauses():
+    audio = speech_with_pauses([("speech", 590), ("pause", 2), ("speech", 598), ("pause", 2), ("speech", 300)], seed=1)
+    points = find_split_points(audio)
+    assert points[0] == 0 and points[-1] == len(audio)
+    assert len(points) == 4
+    assert 590 <= points[1] / SAMPLE_RATE <= 592 and 1190 <= points[2] / SAMPLE_RATE <= 1192
+
+
+def test_short_audio_is_not_split():
+    audio = np.zeros(60 * SAMPLE_RATE, dtype=np.float32)
+    assert find_split_points(audio) == [0, len(audio)]
@@ -0,0 +1,111 @@
+import gzip
+import http.client
+import json
+
+import pytest
+
+from podsnap.audio_server import AudioServer, parse_range
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def server():
+    server = AudioServer("127.0.0.1", 0)
+    yield server
+    server.shutdown()
+
+
+def request(server, path, method="GET", headers=None, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
+
+
+def register(server, tmp_path, data=DATA, name="episode.mp3"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return server.register(str(path))
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    for header in ("bytes=100-", "bytes=-0", "bytes=-", "bytes=9-5", "items=0-1"):
+        with pytest.raises(ValueError): parse_range(header, 100)
+    with pytest.raises(ValueError): parse_range("bytes=0-0", 0)
+
+
+def test_whole_file(server, tmp_path):
+    response, body = request(server, register(server, tmp_path))
+    assert response.status == 200 and body == DATA
+    assert response.getheader("Accept-Ranges") == "bytes" and response.getheader("Content-Type") == "audio/mpeg"
+
+
+def test_ranges(server, tmp_path):
+    url = register(server, tmp_path)
+    for header, (start, end) in (("bytes=10-19", (10, 19)), ("bytes=1000-", (1000, 1023)), ("bytes=-4", (1020, 1023)), ("bytes=1000-5000", (1000, 1023))):
+        response, body = request(server, url, headers={"Range": header})
+        assert response.status == 206 and body == DATA[start:end + 1]
+        assert response.getheader("Content-Range") == f"bytes {start}-{end}/{len(DATA)}"
+
+
+def test_unsatisfiable_and_multiple_ranges(server, tmp_path):
+    url = register(server, tmp_path)
+    response, body = request(server, url, headers={"Range": "bytes=5000-"})
+    assert response.status == 416 and body == b"" and response.getheader("Content-Range") == f"bytes */{len(DATA)}"
+    response, body = request(server, url, headers={"Range": "bytes=0-1,5-6"})
+    assert response.status == 200 and body == DATA
+
+
+def test_head_sends_headers_only(server, tmp_path):
+    response, body = request(server, register(server, tmp_path), method="HEAD", headers={"Range": "bytes=0-9"})
+    assert response.status == 206 and response.getheader("Content-Length") == "10" and body == b""
+
+
+def test_empty_file(server, tmp_path):
+    url = register(server, tmp_path, b"")
+    response, body = request(server, url)
+    assert response.status == 200 and body == b"" and response.getheader("Content-Length") == "0"
+    assert request(server, url, headers={"Range": "bytes=0-"})[0].status == 416
+
+
+def test_unknown_tokens_are_not_found(server, tmp_path):
+    register(server, tmp_path)
+    assert request(server, "/audio/nope.mp3")[0].status == 404
+    assert request(server, "/transcript/nope")[0].status == 404
+
+
+def test_routes(server, tmp_path):
+    token = register(server, tmp_path)[len("/audio/"):].rsplit(".", 1)[0]
+    saved = []
+
+    def get(path, query):
+        if query.get("missing"): raise FileNotFoundError(path)
+        if query.get("broken"): raise OSError("disk error")
+        return {"path": path, "big": "x" * int(query.get("size", 0))}
+
+    server.route("echo", get=get, post=lambda path, query, payload: saved.append(payload["text"]) or len(saved))
+    response, body = request(server, f"/echo/{token}")
+    assert response.status == 200 and json.loads(body)["path"].endswith("episode.mp3")
+    response, body = request(server, f"/echo/{token}?size=4000", headers={"Accept-Encoding": "gzip"})
+    assert response.getheader("Content-Encoding") == "gzip" and len(json.loads(gzip.decompress(body))["big"]) == 4000
+    assert request(server, f"/echo/{token}", "POST", body=json.dumps({"text": "hi"}))[1] == b"1" and saved == ["hi"]
+    assert request(server, f"/echo/{token}", "POST", body=json.dumps({}))[0].status == 400
+    assert request(server, f"/echo/{token}", "POST", body="{")[0].status == 400
+    assert request(server, f"/echo/{token}?missing=1")[0].status == 404
+    assert request(server, f"/echo/{token}?broken=1")[0].status == 500
+
+
+def test_pages(server):
+    server.page("metrics", lambda: "up 1\n")
+    response, body = request(server, "/metrics")
+    assert response.status == 200 and body == b"up 1\n"
@@ -0,0 +1,67 @@
+import gzip
+import os
+import time
+
+from podsnap.cache import DiskCache, TranscriptCache, file_digest
+
+SETTINGS = dict(model="base", language="zh", initial_prompt="请使用简体中文进行转写。", vad=True, int8=False)
+
+
+def test_round_trip_compacts_segments(tmp_path):
+    cache = TranscriptCache(str(tmp_path), 1 << 20)
+    key = cache.make_key("digest", **SETTINGS)
+    stored = cache.put(key, [{"id": 7, "start": 1.23456, "end": 2.5, "text": "你好", "tokens": [1, 2], "avg_logprob": -0.2}])
+    assert stored == [{"id": 0, "start": 1.235, "end": 2.5, "text": "你好"}]
+    assert cache.get(key) == stored
+    assert cache.get(cache.make_key("other", **SETTINGS)) is None
+
+
+def test_key_changes_with_every_setting(tmp_path):
+    cache = TranscriptCache(str(tmp_path), 1 << 20)
+    base = cache.make_key("digest", **SETTINGS)
+    assert cache.make_key("digest", **dict(reversed(list(SETTINGS.items())))) == base
+    changes = dict(model="tiny", language="en", initial_prompt="", vad=False, int8=True)
+    keys = {cache.make_key("digest", **{**SETTINGS, name: value}) for name, value in changes.items()}
+    assert len(keys) == len(changes) and base not in keys
+
+
+def test_corrupt_entries_are_removed(tmp_path):
+    cache = TranscriptCache(str(tmp_path), 1 << 20)
+    key = cache.make_key("digest", **SETTINGS)
+    cache.put(key, [{"start": 0.0, "end": 1.0, "text": "x"}])
+    path = cache.path_for(key, ".json.gz")
+    with gzip.open(path, "wb") as f: f.write(b"{not json")
+    assert cache.get(key) is None and not os.path.exists(path)
+    with open(path, "wb") as f: f.write(b"not gzip at all")
+    assert cache.get(key) is None and not os.path.exists(path)
+
+
+def write(cache, key, size, age):
+    path = cache.path_for(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f: f.write(b"x" * size)
+    os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def test_eviction_is_lru_and_spares_keep(tmp_path):
+    cache = DiskCache(str(tmp_path), 250)
+    oldest, older, new = write(cache, "aa", 100, 300), write(cache, "bb", 100, 200), write(cache, "cc", 100, 0)
+    cache.evict(keep=oldest)
+    assert os.path.exists(oldest) and not os.path.exists(older) and os.path.exists(new)
+
+
+def test_stale_temp_files_are_cleaned_up(tmp_path):
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    stale, fresh = write(cache, "aa.tmp", 10, 2 * 24 * 3600), write(cache, "bb.tmp", 10, 60)
+    cache.evict()
+    assert not os.path.exists(stale) and os.path.exists(fresh)
+
+
+def test_file_digest_follows_content(tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(b"one")
+    first = file_digest(str(path))
+    assert file_digest(str(path)) == first
+    path.write_bytes(b"two!")
+    assert file_digest(str(path)) != first
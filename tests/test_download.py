@@ -0,0 +1,151 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from podsnap import download
+from podsnap.download import AudioStore, _Memo, resolve_audio_url
+
+DATA = bytes(range(256)) * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        header = self.headers.get("Range")
+        server.ranges.append(header)
+        start, end = 0, len(server.data) - 1
+        if header and server.honour_ranges:
+            first, last = header[len("bytes="):].split("-")
+            start, end = int(first), min(int(last), end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(server.data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        body = server.data[start:end + 1]
+        # Simulate a dropped connection: promise the whole range, send only part of it
+        if server.cut_after is not None and header != "bytes=0-0": body = body[:server.cut_after]
+        self.wfile.write(body)
+        if server.cut_after is not None: self.close_connection = True
+
+    def log_message(self, format, *args): pass
+
+
+@pytest.fixture
+def origin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.data, server.ranges, server.honour_ranges, server.cut_after = DATA, [], True, None
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/episode.mp3"
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def small_buffers(monkeypatch):
+    # Flush (and checkpoint) every 8 KB and split anything over 64 KB, so tests stay tiny
+    monkeypatch.setattr(download, "BUFFER_SIZE", 1024)
+    monkeypatch.setattr(download, "MIN_PARALLEL_BYTES", 64 * 1024)
+
+
+def read(path):
+    with open(path, "rb") as f: return f.read()
+
+
+def test_parallel_parts_cover_the_file(tmp_path, origin):
+    info = {}
+    path = AudioStore(str(tmp_path), 1 << 30).fetch(origin.url, requests.Session(), parts=4, info=info)
+    assert read(path) == DATA and info["parts"] == 4
+    quarter = len(DATA) // 4
+    assert sorted(origin.ranges[1:]) == sorted(f"bytes={i * quarter}-{(i + 1) * quarter - 1}" for i in range(4))
+
+
+def test_small_files_use_one_part(tmp_path, origin, monkeypatch):
+    monkeypatch.setattr(download, "MIN_PARALLEL_BYTES", len(DATA) + 1)
+    info = {}
+    path = AudioStore(str(tmp_path), 1 << 30).fetch(origin.url, requests.Session(), parts=4, info=info)
+    assert read(path) == DATA and info["parts"] == 1
+    assert origin.ranges[1:] == [f"bytes=0-{len(DATA) - 1}"]
+
+
+def test_interrupted_download_resumes(tmp_path, origin):
+    store = AudioStore(str(tmp_path), 1 << 30)
+    origin.cut_after = 40 * 1024
+    with pytest.raises(requests.RequestException): store.fetch(origin.url, requests.Session(), parts=2)
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".mp3")]
+    origin.cut_after, origin.ranges = None, []
+    path = store.fetch(origin.url, requests.Session(), parts=2)
+    assert read(path) == DATA
+    # Parts pick up where the first attempt left off; the one that failed had all 40 KB it got on disk
+    # (the other stopped early, as soon as the failure was noticed)
+    half = len(DATA) // 2
+    starts = sorted(int(r[len("bytes="):].split("-")[0]) for r in origin.ranges[1:])
+    assert max(starts[0], starts[1] - half) == 40 * 1024
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".tmp")]
+
+
+def test_server_ignoring_ranges_gets_a_plain_download(tmp_path, origin):
+    origin.honour_ranges = False
+    info = {}
+    path = AudioStore(str(tmp_path), 1 << 30).fetch(origin.url, requests.Session(), parts=4, info=info)
+    assert read(path) == DATA and info["parts"] == 1
+    assert len(origin.ranges) == 2
+
+
+def test_stored_copy_is_reused(tmp_path, origin):
+    store = AudioStore(str(tmp_path), 1 << 30)
+    first = store.fetch(origin.url, requests.Session())
+    origin.ranges, info = [], {}
+    assert store.fetch(origin.url, requests.Session(), info=info) == first and info["parts"] == 0
+    assert origin.ranges == ["bytes=0-0"]
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    store = AudioStore(str(tmp_path), 250)
+    old = store.put_bytes(b"a" * 100, ".mp3")
+    os.utime(old, (0, 0))
+    assert store.put_bytes(b"a" * 100, ".mp3") == old
+    os.utime(old, (0, 0))
+    new = [store.put_bytes(c * 100, ".mp3") for c in (b"b", b"c")]
+    assert not os.path.exists(old) and all(os.path.exists(p) for p in new)
+
+
+def test_memo_expires_and_evicts(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(download, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    memo = _Memo(max_items=2, ttl=10)
+    memo.put("a", 1)
+    memo.put("b", 2)
+    assert memo.get("a") == 1
+    memo.put("c", 3)
+    assert memo.get("b") is None and memo.get("a") == 1
+    now[0] = 11
+    assert memo.get("a") is None
+
+
+def test_resolved_urls_are_memoized(monkeypatch):
+    monkeypatch.setattr(download, "_resolved", _Memo())
+    calls = []
+
+    class Page:
+        text = '<audio src="https://cdn.example.com/ep.m4a?x=1"></audio>'
+
+        def raise_for_status(self): pass
+
+    class Session:
+        def get(self, url, timeout):
+            calls.append(url)
+            return Page()
+
+    assert resolve_audio_url("https://podcast/ep", Session()) == "https://cdn.example.com/ep.m4a?x=1"
+    assert resolve_audio_url("https://podcast/ep", Session()) == "https://cdn.example.com/ep.m4a?x=1"
+    assert calls == ["https://podcast/ep"]
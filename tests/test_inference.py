@@ -0,0 +1,160 @@
+import queue
+import time
+
+import numpy as np
+import pytest
+
+from podsnap import inference
+from podsnap.audio import SAMPLE_RATE
+from podsnap.inference import InferenceService
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.loaded = []
+
+    def get(self, name):
+        self.loaded.append(name)
+        return name
+
+    def fallback(self, name, queue_depth):
+        return name
+
+
+class FakePcm:
+    """Stands in for PcmStore: "paths" are just durations in seconds."""
+
+    def load(self, path):
+        return np.full(int(float(path) * SAMPLE_RATE), 0.1, dtype=np.float32)
+
+
+class FakeCache:
+    def __init__(self, fail=False):
+        self.fail, self.saved = fail, {}
+
+    def put(self, key, segments):
+        if self.fail: raise OSError(28, "No space left on device")
+        self.saved[key] = segments
+        return segments
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    # One segment per window, placed in the window's middle; records each decode call's batch size
+    calls = []
+
+    def decode(model, chunks, language=None, initial_prompt=None):
+        calls.append(len(chunks))
+        return [[{"start": 10.0, "end": 12.0, "text": f"{model}:{len(chunk)}"}] for chunk in chunks]
+
+    monkeypatch.setattr(inference, "decode_windows", decode)
+    return calls
+
+
+def make_service(**kwargs):
+    kwargs.setdefault("pcm_store", FakePcm())
+    kwargs.setdefault("vad", False)
+    return InferenceService(kwargs.pop("registry", FakeRegistry()), **kwargs)
+
+
+def test_transcribes_every_window(batches):
+    job = make_service(batch_size=4).submit("95", "base")
+    assert job.wait(5)
+    assert job.status == "done" and job.progress == 1.0
+    # 95 s in 30 s windows with 2 s overlap: offsets 0, 28, 56, 84
+    assert [s["start"] for s in job.segments] == [10.0, 38.0, 66.0, 94.0]
+    assert batches == [4]
+
+
+def test_concurrent_jobs_share_batches(batches):
+    service = make_service(batch_size=4, max_active=2)
+    jobs = [service.submit("60", "base", cache_key=str(i)) for i in range(2)]
+    assert all(job.wait(5) for job in jobs)
+    assert all(len(job.segments) == 3 for job in jobs)
+    assert max(batches) > 3
+
+
+def test_cache_failure_still_finishes_jobs(batches):
+    service = make_service(cache=FakeCache(fail=True))
+    first = service.submit("30", "base", cache_key="a")
+    assert first.wait(5) and first.status == "done" and first.segments
+    second = service.submit("30", "base", cache_key="b")
+    assert second.wait(5) and second.status == "done"
+
+
+def test_errors_fail_the_job_not_the_service(monkeypatch, batches):
+    service = make_service()
+    monkeypatch.setattr(service, "_emit", lambda *args: 1 / 0)
+    broken = service.submit("30", "base", cache_key="a")
+    assert broken.wait(5) and broken.status == "failed"
+    assert isinstance(broken.error, ZeroDivisionError)
+    monkeypatch.undo()
+    assert service.submit("30", "base", cache_key="b").wait(5)
+
+
+def test_audio_load_failure_fails_the_job(batches):
+    job = make_service().submit("not a duration", "base")
+    assert job.wait(5) and job.status == "failed"
+
+
+def test_same_cache_key_joins_the_running_job(batches):
+    service = make_service()
+    first = service.submit("30", "base", cache_key="same")
+    second = service.submit("30", "base", cache_key="same")
+    assert first is second
+    assert first.wait(5)
+
+
+def test_cancel_waits_for_every_watcher(monkeypatch, batches):
+    service = make_service(max_active=0)
+    job = service.submit("30", "base", cache_key="k")
+    service.submit("30", "base", cache_key="k")
+    job.cancel()
+    assert not job.done and job.position() == 1
+    job.cancel()
+    assert job.done and job.status == "cancelled" and job.position() == 0
+
+
+def test_full_queue_is_rejected(batches):
+    service = make_service(max_active=0, max_queue=1)
+    service.submit("30", "base")
+    with pytest.raises(queue.Full): service.submit("30", "base")
+
+
+def test_vad_segments_map_back_to_the_original_timeline(monkeypatch):
+    class SilentMiddle:
+        def load(self, path):
+            audio = np.random.default_rng(0).normal(0, 0.1, 60 * SAMPLE_RATE).astype(np.float32)
+            audio[10 * SAMPLE_RATE:40 * SAMPLE_RATE] = 0
+            return audio
+
+    monkeypatch.setattr(inference, "decode_windows", lambda model, chunks, **kw: [[{"start": 20.0, "end": 25.0, "text": "x"}] for _ in chunks])
+    job = make_service(pcm_store=SilentMiddle(), vad=True).submit("speech", "base")
+    assert job.wait(5) and job.status == "done"
+    # 20 s into the ~30 s of kept speech is ~20 s past the 10 s that start the 30 s pause
+    start = job.segments[0]["start"]
+    assert 49.0 < start < 51.0
+
+
+def test_pool_jobs_leave_no_scheduler_profile(tmp_path, batches):
+    class FakePool:
+        model_name = "base"
+
+        def transcribe(self, audio, **options):
+            # Long enough for a profiler on the (idle) scheduler thread to collect samples
+            time.sleep(0.2)
+            yield [{"start": 1.0, "end": 2.0, "text": "x"}], 1.0
+
+    service = make_service(pool=FakePool(), pool_min_seconds=10, profile_slow=1e-9, profile_dir=str(tmp_path))
+    pooled = service.submit("30", "base", cache_key="pool")
+    assert pooled.wait(5) and pooled.status == "done" and batches == []
+    assert not list(tmp_path.iterdir())
+
+
+def test_shutdown_stops_the_scheduler_and_cancels_jobs(batches):
+    service = make_service(max_active=0)
+    job = service.submit("30", "base")
+    service.shutdown(timeout=5)
+    assert not service._thread.is_alive()
+    assert job.done and job.status == "cancelled"
+    with pytest.raises(RuntimeError): service.submit("30", "base")
@@ -0,0 +1,75 @@
+import os
+import threading
+
+import pytest
+
+from podsnap.metrics import Metrics
+
+
+def lines(metrics):
+    return metrics.render().splitlines()
+
+
+def test_render_buckets_counters_and_gauges():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.record("download", 0.05, bytes=100)
+    metrics.record("download", 0.5, bytes=50)
+    metrics.record("download", 5.0)
+    metrics.record("transcribe", 2.0, audio_seconds=60.0)
+    metrics.gauge("podsnap_jobs_queued", lambda: 3, "Queued jobs.")
+    metrics.gauge("podsnap_broken", lambda: 1 / 0)
+    out = lines(metrics)
+    labels = 'stage="download",status="ok"'
+    assert f'podsnap_stage_duration_seconds_bucket{{{labels},le="0.1"}} 1' in out
+    assert f'podsnap_stage_duration_seconds_bucket{{{labels},le="1"}} 2' in out
+    assert f'podsnap_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in out
+    assert f"podsnap_stage_duration_seconds_sum{{{labels}}} 5.550000" in out
+    assert f"podsnap_stage_duration_seconds_count{{{labels}}} 3" in out
+    assert f"podsnap_stage_bytes_total{{{labels}}} 150" in out
+    assert 'podsnap_stage_audio_seconds_total{stage="transcribe",status="ok"} 60' in out
+    # Stages without bytes get no bytes sample
+    assert not [line for line in out if line.startswith('podsnap_stage_bytes_total{stage="transcribe"')]
+    assert "podsnap_jobs_queued 3" in out and "# TYPE podsnap_jobs_queued gauge" in out
+    # A failing gauge is left out instead of breaking the export
+    assert not [line for line in out if "podsnap_broken" in line]
+
+
+def test_stage_records_errors_and_extra_fields():
+    metrics = Metrics()
+    with pytest.raises(RuntimeError):
+        with metrics.stage("resolve"): raise RuntimeError("boom")
+    with metrics.stage("download") as info: info["bytes"] = 10
+    with metrics.stage("decode") as info: info["status"] = "skipped"
+    out = lines(metrics)
+    assert 'podsnap_stage_duration_seconds_count{stage="resolve",status="error"} 1' in out
+    assert 'podsnap_stage_bytes_total{stage="download",status="ok"} 10' in out
+    assert 'podsnap_stage_duration_seconds_count{stage="decode",status="skipped"} 1' in out
+
+
+def test_concurrent_writers_leave_a_complete_file(tmp_path):
+    path = str(tmp_path / "podsnap.prom")
+    second_done, errors = threading.Event(), []
+
+    class Slow(Metrics):
+        # The first writer is stuck rendering (its temp file already open) while the second one finishes
+        def render(self):
+            name = threading.current_thread().name
+            if name == "first": second_done.wait(5)
+            return f"{name}\n" * (2 if name == "first" else 5)
+
+    def write(name):
+        try: Slow().write(path)
+        except OSError as e: errors.append(e)
+        finally:
+            if name == "second": second_done.set()
+
+    first = threading.Thread(target=write, args=("first",), name="first")
+    first.start()
+    while not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]: threading.Event().wait(0.001)
+    second = threading.Thread(target=write, args=("second",), name="second")
+    second.start()
+    first.join(5)
+    second.join(5)
+    assert not errors
+    with open(path) as f: assert f.read() == "first\n" * 2
+    assert os.listdir(tmp_path) == ["podsnap.prom"]
@@ -0,0 +1,62 @@
+import logging
+import time
+
+from podsnap.models import ModelRegistry
+
+
+def make_registry(loaded=(), depth=4, fail=False):
+    registry = ModelRegistry(("tiny", "base", "small"), fallback_depth=depth)
+    # Pretend these were loaded already; fallback must never load anything on the caller's thread
+    for name in loaded: registry._models[name] = object()
+
+    def get(name):
+        if fail: raise OSError("download failed")
+        return registry._models.setdefault(name, object())
+
+    registry.get = get
+    return registry
+
+
+def test_no_fallback_without_queue():
+    assert make_registry(loaded=("tiny", "base", "small")).fallback("small", 3) == "small"
+
+
+def test_steps_down_one_tier_per_depth():
+    registry = make_registry(loaded=("tiny", "base", "small"))
+    assert registry.fallback("small", 4) == "base"
+    assert registry.fallback("small", 8) == "tiny"
+    assert registry.fallback("small", 100) == "tiny"
+
+
+def test_only_loaded_tiers_qualify():
+    assert make_registry(loaded=("small",)).fallback("small", 8) == "small"
+    assert make_registry(loaded=("base", "small")).fallback("small", 8) == "base"
+    assert make_registry(loaded=("tiny",)).fallback("small", 4) == "small"
+
+
+def test_disabled_or_unknown_tier():
+    assert make_registry(loaded=("tiny", "base"), depth=0).fallback("base", 100) == "base"
+    assert make_registry(loaded=("tiny",)).fallback("large", 100) == "large"
+
+
+def test_deep_queue_warms_the_wanted_tier_in_the_background():
+    registry = make_registry(loaded=("small",))
+    assert registry.fallback("small", 8) == "small"
+    for _ in range(500):
+        if registry.is_loaded("tiny"): break
+        time.sleep(0.01)
+    assert registry.fallback("small", 8) == "tiny"
+
+
+def test_a_tier_is_warmed_once_at_a_time():
+    registry = make_registry(loaded=("small",))
+    registry._warming.add("tiny")
+    assert registry._warm("tiny") is None and registry.fallback("small", 8) == "small"
+    assert registry._warm("small") is None
+
+
+def test_preload_failures_are_logged(caplog):
+    registry = make_registry(fail=True)
+    with caplog.at_level(logging.ERROR, logger="podsnap.models"): registry.preload(["tiny"]).join(5)
+    assert "could not preload model tiny" in caplog.text
+    assert not registry.is_loaded("tiny")
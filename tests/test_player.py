@@ -0,0 +1,69 @@
+import http.client
+import json
+
+import pytest
+
+from podsnap.audio_server import AudioServer
+from podsnap.player import TranscriptPayloads, transcript_payload
+
+SEGMENTS = [
+    {"id": 1, "start": 4.00049, "end": 9.0, "text": "第二句", "tokens": [3, 4]},
+    {"id": 0, "start": 0.0, "end": 4.0, "text": "第一句", "tokens": [1, 2]},
+]
+
+
+def test_payload_is_sorted_and_compact():
+    _, payload = transcript_payload(SEGMENTS)
+    assert json.loads(payload) == {"start": [0.0, 4.0], "end": [4.0, 9.0], "text": ["第一句", "第二句"]}
+    assert "第一句".encode("utf-8") in payload and b" " not in payload
+
+
+def test_version_follows_content_only():
+    version, payload = transcript_payload(SEGMENTS)
+    # Reruns rebuild the segment list (new ids, extra fields, another order): same content, same version
+    rebuilt = [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in reversed(SEGMENTS)]
+    assert transcript_payload(rebuilt) == (version, payload)
+    edited = [dict(SEGMENTS[0], text="改过的"), SEGMENTS[1]]
+    assert transcript_payload(edited)[0] != version
+
+
+def test_payloads_are_kept_per_version():
+    store = TranscriptPayloads()
+    ours, theirs = transcript_payload(SEGMENTS), transcript_payload([dict(SEGMENTS[1], text="另一份转写")])
+    # Two sessions showing the same audio with different transcripts do not overwrite each other
+    store.put("/audio/a.mp3", *ours)
+    store.put("/audio/a.mp3", *theirs)
+    assert store.get("/audio/a.mp3", ours[0]) == ours[1]
+    assert store.get("/audio/a.mp3", theirs[0]) == theirs[1]
+    with pytest.raises(KeyError): store.get("/audio/b.mp3", ours[0])
+
+
+def test_least_recently_published_payload_is_evicted():
+    store = TranscriptPayloads(max_items=2)
+    store.put("a", "1", b"a")
+    store.put("b", "1", b"b")
+    # Republishing (as every rerun does) keeps a payload fresh
+    store.put("a", "1", b"a")
+    store.put("c", "1", b"c")
+    assert store.get("a", "1") == b"a" and store.get("c", "1") == b"c"
+    with pytest.raises(KeyError): store.get("b", "1")
+
+
+def test_unknown_versions_are_bad_requests(tmp_path):
+    audio = tmp_path / "a.mp3"
+    audio.write_bytes(b"x")
+    server, store = AudioServer("127.0.0.1", 0), TranscriptPayloads()
+    try:
+        server.route("transcript", get=lambda path, query: store.get(path, query.get("v")))
+        token = server.register(str(audio))[len("/audio/"):].rsplit(".", 1)[0]
+        version, payload = transcript_payload(SEGMENTS)
+        store.put(str(audio), version, payload)
+        for v, status in ((version, 200), ("stale", 400)):
+            conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+            conn.request("GET", f"/transcript/{token}?v={v}")
+            response = conn.getresponse()
+            assert response.status == status
+            if status == 200: assert response.read() == payload
+            conn.close()
+    finally:
+        server.shutdown()
@@ -0,0 +1,30 @@
+from podsnap import config
+from podsnap.recommend import FALLBACKS, KeywordAutomaton, Recommender
+
+
+def names(items):
+    return [item["name"] for item in items]
+
+
+def brute_force(keywords, text):
+    return sorted((i, payload) for keyword, payload in keywords for i in range(len(text)) if text.startswith(keyword, i))
+
+
+def test_automaton_matches_plain_substring_search():
+    keywords = [("he", 0), ("she", 1), ("his", 2), ("hers", 3), ("咖啡", 4), ("啡", 5), ("AI", 6)]
+    for text in ("ushers", "she said his hers", "我爱喝咖啡，AI 咖啡", "", "MAIN again"):
+        assert sorted(KeywordAutomaton(keywords).iter_matches(text)) == brute_force(keywords, text)
+
+
+def test_ascii_keywords_are_case_sensitive():
+    recommender = Recommender.from_file(config.CATALOG_PATH)
+    assert "氮化镓快充头" not in names(recommender.recommend("he said again"))
+    assert names(recommender.recommend("聊聊 AI 和手机"))[0] == "氮化镓快充头"
+
+
+def test_ranking_and_fallbacks():
+    recommender = Recommender.from_file(config.CATALOG_PATH)
+    assert names(recommender.recommend("咖啡 咖啡 书")) == ["精品挂耳咖啡", "《反脆弱》精装版", FALLBACKS[1]["name"]]
+    items = recommender.recommend("什么都没有")
+    assert names(items) == [FALLBACKS[0]["name"], FALLBACKS[1]["name"]]
+    assert all("keywords" not in item and item["img"] for item in items)
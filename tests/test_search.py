@@ -0,0 +1,86 @@
+import sqlite3
+
+from podsnap.search import SearchIndex, match_query, ngrams
+
+ALICE, BOB = "alice-owner-id-0001", "bob-owner-id-000001"
+
+
+def make_index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add_episode("ep1", "读书节目", "/tmp/ep1.mp3", [
+        {"start": 0.0, "end": 4.0, "text": "我喜欢读书"},
+        {"start": 4.0, "end": 9.0, "text": "Coffee 和 AI 的故事"},
+    ])
+    index.add_owner(ALICE, "ep1", "读书节目")
+    return index
+
+
+def texts(hits):
+    return [hit["text"] for hit in hits]
+
+
+def test_ngrams_bigrams_with_trailing_unigram():
+    assert ngrams("我喜欢读书") == "我喜 喜欢 欢读 读书 书"
+    assert ngrams("书") == "书"
+    assert ngrams("Hello 世界") == "hello 世界 界"
+
+
+def test_match_query_phrases():
+    assert match_query("读书") == '"读书"'
+    assert match_query("书") == '"书"*'
+    assert match_query("喜欢读 coffee") == '"喜欢 欢读" "coffee"'
+    assert match_query("  !! ") == ""
+
+
+def test_single_character_matches_every_position(tmp_path):
+    index = make_index(tmp_path)
+    assert texts(index.search("书", owner=ALICE)) == ["我喜欢读书"]
+    assert texts(index.search("读", owner=ALICE)) == ["我喜欢读书"]
+    assert texts(index.search("我", owner=ALICE)) == ["我喜欢读书"]
+
+
+def test_phrases_and_words(tmp_path):
+    index = make_index(tmp_path)
+    assert texts(index.search("喜欢读", owner=ALICE)) == ["我喜欢读书"]
+    assert index.search("读喜", owner=ALICE) == []
+    assert texts(index.search("coffee", owner=ALICE)) == ["Coffee 和 AI 的故事"]
+    assert index.search("", owner=ALICE) == []
+
+
+def test_replacing_an_episode_drops_old_segments(tmp_path):
+    index = make_index(tmp_path)
+    index.add_episode("ep1", "读书节目", "/tmp/ep1.mp3", [{"start": 0.0, "end": 2.0, "text": "今天聊咖啡"}])
+    assert index.search("读书", owner=ALICE) == []
+    assert [s["text"] for s in index.segments("ep1")] == ["今天聊咖啡"]
+
+
+def test_quotes_are_scoped_to_their_owner(tmp_path):
+    index = make_index(tmp_path)
+    index.add_owner(BOB, "ep1", "bob's copy")
+    index.add_quote(ALICE, "ep1", 0.0, 4.0, "我喜欢读书")
+    assert [q["text"] for q in index.quotes(ALICE, "ep1")] == ["我喜欢读书"]
+    assert index.quotes(BOB, "ep1") == []
+    assert [h["kind"] for h in index.search("读书", owner=ALICE)] == ["quote", "segment"]
+    assert [(h["kind"], h["title"]) for h in index.search("读书", owner=BOB)] == [("segment", "bob's copy")]
+
+
+def test_transcripts_are_only_found_by_owners_who_imported_them(tmp_path):
+    index = make_index(tmp_path)
+    assert index.search("读书", owner=BOB) == [] and index.search("读书") == []
+    assert index.episode("ep1", BOB) is None
+    assert index.episode("ep1", ALICE)["title"] == "读书节目"
+    index.add_owner(BOB, "ep1", "ep1.mp3")
+    assert [h["title"] for h in index.search("读书", owner=BOB)] == ["ep1.mp3"]
+
+
+def test_old_databases_are_reindexed(tmp_path):
+    path = str(tmp_path / "search.db")
+    make_index(tmp_path)._db.close()
+    # Simulate a database written with the previous tokenization (bigrams only)
+    db = sqlite3.connect(path)
+    with db:
+        db.execute("DELETE FROM segments_fts")
+        db.execute("INSERT INTO segments_fts (rowid, grams) SELECT id, ? FROM segments WHERE text = ?", ("我喜 喜欢 欢读 读书", "我喜欢读书"))
+        db.execute("PRAGMA user_version = 0")
+    db.close()
+    assert texts(SearchIndex(path).search("书", owner=ALICE)) == ["我喜欢读书"]
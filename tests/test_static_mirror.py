@@ -0,0 +1,31 @@
+import os
+
+from podsnap import static_mirror
+from podsnap.static_mirror import StaticMirror
+
+
+def test_files_are_linked_once_and_reused(tmp_path):
+    source = tmp_path / "episode.mp3"
+    source.write_bytes(b"x" * 100)
+    mirror = StaticMirror(str(tmp_path / "static"), 1 << 20, "/app/static/podsnap/")
+    url = mirror.add_file("token", str(source))
+    assert url == "/app/static/podsnap/to/token.mp3"
+    assert mirror.add_file("token", str(source)) == url
+    assert os.path.samefile(mirror.path_for("token", ".mp3"), source)
+
+
+def test_files_streamlit_would_not_serve_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(static_mirror, "MAX_FILE_BYTES", 10)
+    source = tmp_path / "episode.mp3"
+    source.write_bytes(b"x" * 100)
+    assert StaticMirror(str(tmp_path / "static"), 1 << 20, "/static").add_file("token", str(source)) is None
+
+
+def test_payloads_are_evicted_least_recently_used_first(tmp_path):
+    mirror = StaticMirror(str(tmp_path), 250, "/static")
+    first = mirror.add_bytes("aa.1", ".json", b"x" * 100)
+    os.utime(mirror.path_for("aa.1", ".json"), (0, 0))
+    mirror.add_bytes("bb.1", ".json", b"x" * 100)
+    mirror.add_bytes("cc.1", ".json", b"x" * 100)
+    assert first.endswith("aa.1.json") and not os.path.exists(mirror.path_for("aa.1", ".json"))
+    assert os.path.exists(mirror.path_for("cc.1", ".json"))